@@ -4,11 +4,14 @@ import pandas as pd
 import plotly.express as px
 from pathlib import Path
 import json
+from src.sim.store import EventStore
+from src.reporting.pnl_attribution import attribution_from_exec
 
 st.set_page_config(page_title="MM_SENTIMENT Dashboard v11", layout="wide")
 st.title("📈 MM_SENTIMENT v11 — Impact + Regimes + Smart Router")
 
-data_path = st.text_input("Path to events CSV", "data/market_events/events_multi_v11.csv")
+store_path = st.text_input("Event store directory", "data/store")
+data_path = st.text_input("Path to events CSV (used when the store is empty)", "data/market_events/events_multi_v11.csv")
 attrib_path = st.text_input("PnL Attribution CSV", "reports/pnl_attribution_v11.csv")
 mc_path = st.text_input("MC Summary JSON", "reports/MC_SUMMARY_v11.json")
 auto = st.checkbox("Auto-refresh every 2s", value=False)
@@ -20,15 +23,29 @@ def load_df(p):
         except Exception: return pd.DataFrame()
     return pd.DataFrame()
 
+store = EventStore(store_path)
+runs = store.runs("events")
+run_id = st.selectbox("Run", runs, key="run") if runs else None
+
+def store_symbols(run):
+    d = Path(store_path) / "events" / f"run_id={run}"
+    return sorted(x.name.split("=", 1)[1] for x in d.iterdir() if x.name.startswith("symbol="))
+
 while True:
-    df = load_df(data_path)
+    if run_id is not None:
+        symbols = store_symbols(run_id)
+        sym = st.selectbox("Symbol", symbols, key="sym")
+        sub = store.read("events", columns=["timestamp","pnl","inventory","alpha"], symbols=[sym], run_ids=[run_id]).sort_values("timestamp")
+        df = store.read("events", columns=["timestamp","var_pf"], run_ids=[run_id])
+    else:
+        df = load_df(data_path)
+        if not df.empty:
+            symbols = sorted(df["symbol"].unique())
+            sym = st.selectbox("Symbol", symbols, key="sym")
+            sub = df[df["symbol"]==sym].copy()
     if df.empty:
-        st.info("CSV not found yet. Run `python main.py` first to generate it.")
+        st.info("No events found yet. Run `python main.py` first to generate them.")
     else:
-        symbols = sorted(df["symbol"].unique())
-        sym = st.selectbox("Symbol", symbols, key="sym")
-        sub = df[df["symbol"]==sym].copy()
-
         c1, c2 = st.columns(2)
         with c1: st.plotly_chart(px.line(sub, x="timestamp", y="pnl", title=f"{sym} PnL"), use_container_width=True)
         with c2: st.plotly_chart(px.line(sub, x="timestamp", y="inventory", title=f"{sym} Inventory"), use_container_width=True)
@@ -41,7 +58,9 @@ while True:
             st.plotly_chart(px.line(pf, x="timestamp", y="var_pf", title="Portfolio VaR (1-step 95%)"), use_container_width=True)
 
         st.subheader("Execution PnL Attribution (by venue)")
-        if Path(attrib_path).exists():
+        if run_id is not None:
+            st.dataframe(attribution_from_exec(store, run_id=run_id), use_container_width=True)
+        elif Path(attrib_path).exists():
             attrib = pd.read_csv(attrib_path); st.dataframe(attrib, use_container_width=True)
         else:
             st.info("Attribution CSV not found yet.")
@@ -1,11 +1,14 @@
 from dataclasses import dataclass
+from typing import Optional, Tuple
+import numpy as np
 
 @dataclass
 class NewsItem:
     ts: int
     headline: str
+    symbols: Tuple[str, ...] = ()   # empty: applies to every symbol
 
-def synthetic_news_tape(symbol: str):
+def synthetic_news_tape(symbol: str, jitter: int = 0, rng: Optional[np.random.Generator] = None):
     items = [
         NewsItem(0, "Company beats earnings and raises guidance"),
         NewsItem(50, "Analyst downgrades on valuation concerns"),
@@ -16,4 +19,8 @@ def synthetic_news_tape(symbol: str):
         NewsItem(350, "CEO interview: confident on growth"),
         NewsItem(450, "Supply chain disruption in a key region"),
     ]
+    if jitter > 0:
+        rng = rng if rng is not None else np.random.default_rng()
+        shifts = rng.integers(-jitter, jitter + 1, size=len(items))
+        items = sorted((NewsItem(max(0, it.ts + int(d)), it.headline) for it, d in zip(items, shifts)), key=lambda it: it.ts)
     return items
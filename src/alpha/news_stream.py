@@ -0,0 +1,167 @@
+import asyncio, json, os, queue, socket, threading, time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.alpha.news_ingestor import NewsItem, synthetic_news_tape
+
+# Streaming news: async sources yield raw lines, which are parsed, timestamped and routed to
+# bounded per-symbol queues. The simulation drains those queues without blocking; when a
+# queue is full the pump stops reading its source until the simulation catches up.
+
+def parse_item(raw, now_ms: Optional[int] = None) -> NewsItem:
+    # JSON object (or a line of it) with "headline" and optional "ts" and "symbol"/"symbols".
+    # Items without "ts" are stamped with the receipt time in ms. No symbols = every symbol.
+    obj = json.loads(raw) if isinstance(raw, (str, bytes)) else raw
+    headline = obj["headline"]
+    syms = obj.get("symbols", obj.get("symbol", ()))
+    syms = (syms,) if isinstance(syms, str) else tuple(syms)
+    ts = obj.get("ts")
+    return NewsItem(int(ts) if ts is not None else (now_ms if now_ms is not None else int(time.time() * 1000)), headline, syms)
+
+async def jsonl_tail(path: str, poll: float = 0.05, from_start: bool = True, stop: Optional[threading.Event] = None) -> AsyncIterator[str]:
+    # Follows a JSONL file like `tail -f`, waiting for the file to appear and for new lines.
+    while not os.path.exists(path):
+        if stop is not None and stop.is_set(): return
+        await asyncio.sleep(poll)
+    with open(path, "r") as f:
+        if not from_start: f.seek(0, os.SEEK_END)
+        buf = ""
+        while stop is None or not stop.is_set():
+            chunk = f.readline()
+            if not chunk:
+                await asyncio.sleep(poll); continue
+            buf += chunk
+            if buf.endswith("\n"):
+                line, buf = buf.strip(), ""
+                if line: yield line
+
+async def socket_lines(host: str = "127.0.0.1", port: int = 0, ready: Optional[threading.Event] = None,
+                       bound: Optional[list] = None, stop: Optional[threading.Event] = None) -> AsyncIterator[str]:
+    # Local stand-in for a vendor socket: accepts any number of clients that write JSONL lines.
+    lines: asyncio.Queue = asyncio.Queue(maxsize=1024)
+
+    async def on_client(reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                line = line.decode().strip()
+                if line: await lines.put(line)
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(on_client, host, port)
+    if bound is not None: bound.append(server.sockets[0].getsockname()[1])
+    if ready is not None: ready.set()
+    async with server:
+        while stop is None or not stop.is_set():
+            try:
+                yield await asyncio.wait_for(lines.get(), timeout=0.1)
+            except asyncio.TimeoutError:
+                continue
+
+def publish_jsonl(host: str, port: int, items: Iterable[dict]):
+    # Small client for the socket source (tests, demos).
+    with socket.create_connection((host, port)) as s:
+        s.sendall("".join(json.dumps(it) + "\n" for it in items).encode())
+
+class NewsRouter:
+    # Bounded per-symbol queues (thread-safe, so the simulation can drain them from its own
+    # thread). put() awaits while a target queue is full.
+    def __init__(self, symbols: Sequence[str], maxsize: int = 1024, poll: float = 0.01):
+        self.queues: Dict[str, queue.Queue] = {s: queue.Queue(maxsize) for s in symbols}
+        self.poll = poll
+        self.routed = 0; self.unknown = 0; self.bad = 0
+
+    async def put(self, item: NewsItem):
+        targets = [s for s in item.symbols if s in self.queues] if item.symbols else list(self.queues)
+        if item.symbols and not targets: self.unknown += 1
+        for s in targets:
+            q = self.queues[s]
+            while True:
+                try:
+                    q.put_nowait(item); break
+                except queue.Full:
+                    await asyncio.sleep(self.poll)   # backpressure: stop pulling from the source
+            self.routed += 1
+
+    def drain(self, symbol: str, limit: Optional[int] = None) -> List[NewsItem]:
+        out, q = [], self.queues[symbol]
+        while limit is None or len(out) < limit:
+            try: out.append(q.get_nowait())
+            except queue.Empty: break
+        return out
+
+class TapeFeed:
+    # Synchronous feed over per-symbol lists of NewsItem whose ts are simulation steps:
+    # poll(t) returns what is due by step t. Deterministic, so used for synthetic tapes.
+    def __init__(self, tapes: Dict[str, List[NewsItem]]):
+        self.tapes = tapes
+        self.idx = {s: 0 for s in tapes}
+
+    def poll(self, t: int) -> List[Tuple[str, str]]:
+        out = []
+        for s, news in self.tapes.items():
+            i = self.idx[s]
+            while i < len(news) and t >= news[i].ts:
+                out.append((s, news[i].headline)); i += 1
+            self.idx[s] = i
+        return out
+
+    def close(self):
+        pass
+
+class StreamFeed:
+    # Runs the async sources on an event loop in a daemon thread. Each source is pumped
+    # (parse -> route) concurrently; poll() hands over whatever has arrived, never waiting.
+    def __init__(self, symbols: Sequence[str], maxsize: int = 1024, per_poll: Optional[int] = None):
+        self.router = NewsRouter(symbols, maxsize=maxsize)
+        self.per_poll = per_poll
+        self._loop = asyncio.new_event_loop()
+        self._stop = threading.Event()   # set from any thread; sources only check is_set()
+        self._sources = []
+        self._thread: Optional[threading.Thread] = None
+
+    def add_source(self, factory):
+        # factory(stop_event) -> async iterator of raw lines/dicts; stop_event is a threading.Event
+        self._sources.append(factory); return self
+
+    async def _pump(self, source):
+        async for raw in source:
+            try: item = parse_item(raw)
+            except (ValueError, KeyError, TypeError):
+                self.router.bad += 1; continue
+            await self.router.put(item)
+
+    async def _main(self):
+        await asyncio.gather(*(self._pump(f(self._stop)) for f in self._sources))
+
+    def start(self) -> "StreamFeed":
+        def run():
+            asyncio.set_event_loop(self._loop)
+            self._loop.run_until_complete(self._main())
+        self._thread = threading.Thread(target=run, name="news-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def poll(self, t: int) -> List[Tuple[str, str]]:
+        return [(s, it.headline) for s in self.router.queues for it in self.router.drain(s, self.per_poll)]
+
+    def close(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive(): return   # still unwinding; the daemon thread owns the loop
+            self._thread = None
+        if not self._loop.is_closed(): self._loop.close()
+
+def make_feed(cfg, symbols: Sequence[str], rngs=None):
+    if cfg.news_source == "synthetic":
+        return TapeFeed({s: synthetic_news_tape(s, jitter=cfg.news_jitter, rng=rngs.get("news", s) if rngs else None)
+                         for s in symbols})
+    feed = StreamFeed(symbols, maxsize=cfg.news_queue_size)
+    if cfg.news_source == "jsonl":
+        feed.add_source(lambda stop: jsonl_tail(cfg.news_path, stop=stop))
+    elif cfg.news_source == "socket":
+        feed.add_source(lambda stop: socket_lines(cfg.news_host, cfg.news_port, stop=stop))
+    else:
+        raise ValueError(f"Unknown news_source: {cfg.news_source!r} (expected 'synthetic', 'jsonl' or 'socket')")
+    return feed.start()
@@ -1,19 +1,146 @@
+import re, json, time, argparse
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+DEFAULT_LEXICON: Dict[str, float] = {
+    "beats": 0.2, "raises": 0.2, "strong": 0.168, "upbeat": 0.168,
+    "upgrade": 0.166, "buyback": 0.148, "macro": 0.118, "confident": 0.294,
+    "downgrade": -0.04, "resigns": -0.066, "disruption": -0.036, "probe": -0.04,
+    "competitor": -0.042, "dividend": -0.052
+}
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    # Regex shaped like a prefix trie, so each position costs one branch per next character
+    # instead of one attempt per keyword (the automaton an Aho-Corasick matcher would build).
+    trie: dict = {}
+    for w in words:
+        node = trie
+        for c in w: node = node.setdefault(c, {})
+        node[""] = True
+    def build(node) -> str:
+        alts = [re.escape(c) + build(node[c]) for c in sorted(k for k in node if k)]
+        if not alts: return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+    return build(trie)
+
+class KeywordMatcher:
+    # One compiled trie regex for the whole lexicon. Used as a lookahead, it reports the
+    # longest keyword starting at every position. Each keyword carries the lexicon words it
+    # contains, so the words found are exactly those that occur as substrings. A keyword
+    # counts once per headline, however often it occurs.
+    def __init__(self, lexicon: Dict[str, float]):
+        words = sorted({w.lower() for w in lexicon}, key=len, reverse=True)
+        weight = {w.lower(): float(v) for w, v in lexicon.items()}
+        self.words = words
+        self.weights = np.array([weight[w] for w in words])
+        self._id = {w: i for i, w in enumerate(words)}
+        self._implied = [[self._id[u] for u in words if u in w] for w in words]
+        self._re = re.compile("(?=(" + _trie_pattern(words) + "))") if words else None
+
+    def score(self, headline: str) -> float:
+        if self._re is None: return 0.0
+        ids = {i for m in self._re.finditer(headline.lower()) for i in self._implied[self._id[m.group(1)]]}
+        return float(sum(self.weights[i] for i in ids))
+
+    def score_batch(self, headlines: Sequence[str]) -> np.ndarray:
+        # One regex pass over all headlines joined by newlines; match offsets map back to
+        # headlines by binary search over the line starts.
+        n = len(headlines)
+        if n == 0 or self._re is None: return np.zeros(n)
+        text = "\n".join(headlines).lower()
+        starts = np.cumsum([0] + [len(h) + 1 for h in headlines[:-1]])
+        pos, wid = [], []
+        implied, ids = self._implied, self._id
+        for m in self._re.finditer(text):
+            for i in implied[ids[m.group(1)]]:
+                pos.append(m.start()); wid.append(i)
+        if not pos: return np.zeros(n)
+        row = np.searchsorted(starts, pos, side="right") - 1
+        key = np.unique(row * len(self.words) + np.asarray(wid))
+        return np.bincount(key // len(self.words), weights=self.weights[key % len(self.words)], minlength=n)
+
+_DEFAULT_MATCHER: Optional[KeywordMatcher] = None
+
+def default_matcher() -> KeywordMatcher:
+    global _DEFAULT_MATCHER
+    if _DEFAULT_MATCHER is None: _DEFAULT_MATCHER = KeywordMatcher(DEFAULT_LEXICON)
+    return _DEFAULT_MATCHER
+
+def load_lexicon(lexicon: Optional[Dict[str, float]] = None, path: Optional[str] = None) -> Dict[str, float]:
+    # Built-in lexicon, overridden by a YAML/JSON word -> weight file, then by inline entries.
+    out = dict(DEFAULT_LEXICON)
+    if path:
+        with open(path, "r") as f:
+            if path.endswith(".json"): out.update(json.load(f))
+            else:
+                import yaml
+                out.update(yaml.safe_load(f) or {})
+    if lexicon: out.update(lexicon)
+    return out
+
 class SentimentSignal:
-    def __init__(self, smooth=0.2):
+    def __init__(self, smooth=0.2, matcher: Optional[KeywordMatcher] = None):
         self.smooth = smooth
         self.last = 0.0
+        self.matcher = matcher or default_matcher()
 
     def on_news(self, headline: str):
-        mapping = {
-            "beats": 0.2, "raises": 0.2, "strong": 0.168, "upbeat": 0.168,
-            "upgrade": 0.166, "buyback": 0.148, "macro": 0.118, "confident": 0.294,
-            "downgrade": -0.04, "resigns": -0.066, "disruption": -0.036, "probe": -0.04,
-            "competitor": -0.042, "dividend": -0.052
-        }
-        score = 0.0
-        h = headline.lower()
-        for k,v in mapping.items():
-            if k in h:
-                score += v
+        score = self.matcher.score(headline)
         self.last = (1-self.smooth)*self.last + self.smooth*score
         return self.last
+
+class SentimentBook:
+    # Smoothed alphas for many symbols in one array. on_batch scores a batch of
+    # (symbol, headline) pairs in one matcher pass and applies each symbol's EMA updates in
+    # arrival order in closed form: with k headlines for a symbol, the j-th (0-based) gets
+    # weight s*(1-s)**(k-1-j) and the previous alpha decays by (1-s)**k.
+    def __init__(self, symbols: Sequence[str], smooth: float = 0.2, matcher: Optional[KeywordMatcher] = None):
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.smooth = smooth
+        self.matcher = matcher or default_matcher()
+        self.alpha = np.zeros(len(self.symbols))
+
+    def __getitem__(self, symbol: str) -> float:
+        return float(self.alpha[self.index[symbol]])
+
+    def on_batch(self, symbols: Sequence[str], headlines: Sequence[str]) -> np.ndarray:
+        if len(headlines) == 0: return self.alpha
+        sym = np.fromiter((self.index[s] for s in symbols), dtype=np.int64, count=len(symbols))
+        scores = self.matcher.score_batch(headlines)
+        k = np.bincount(sym, minlength=len(self.alpha))
+        order = np.argsort(sym, kind="stable")
+        first = np.concatenate(([0], np.cumsum(k)[:-1]))
+        rank = np.empty(len(sym), dtype=np.int64)
+        rank[order] = np.arange(len(sym)) - first[sym[order]]
+        keep = 1.0 - self.smooth
+        w = self.smooth * keep ** (k[sym] - 1 - rank)
+        self.alpha = keep ** k * self.alpha + np.bincount(sym, weights=w * scores, minlength=len(self.alpha))
+        return self.alpha
+
+def _bench(n: int, lexicon: Dict[str, float]):
+    from src.alpha.news_ingestor import synthetic_news_tape
+    base = [it.headline for it in synthetic_news_tape("X")]
+    heads = [base[i % len(base)] + f" #{i}" for i in range(n)]
+    m = KeywordMatcher(lexicon)
+
+    def naive(h):
+        h = h.lower(); return sum(v for k, v in lexicon.items() if k in h)
+    for name, fn in (("per-keyword scan", lambda: [naive(h) for h in heads]),
+                     ("compiled, per headline", lambda: [m.score(h) for h in heads]),
+                     ("compiled, batch", lambda: m.score_batch(heads))):
+        t0 = time.perf_counter(); fn(); dt = time.perf_counter() - t0
+        print(f"{name:24s} {n / dt:12,.0f} headlines/s")
+
+def main():
+    ap = argparse.ArgumentParser(description="Sentiment scoring throughput")
+    ap.add_argument("--headlines", type=int, default=200_000)
+    ap.add_argument("--words", type=int, default=0, help="pad the lexicon with this many extra synthetic keywords")
+    args = ap.parse_args()
+    lex = dict(DEFAULT_LEXICON)
+    lex.update({f"kw{i:05d}x": 0.01 for i in range(args.words)})
+    _bench(args.headlines, lex)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-from collections import defaultdict, deque
+import heapq, math
 from dataclasses import dataclass
-from typing import Dict, Deque, Optional
+from typing import Dict, List, Optional
 from src.execution.order import Order
 
 @dataclass
@@ -8,102 +8,241 @@ class BookLevel:
     price: float
     qty: int
 
+class _Node:
+    __slots__ = ("order", "side", "level", "prev", "next")
+
+    def __init__(self, order: Order, side: str):
+        self.order = order; self.side = side
+        self.level: Optional["_Level"] = None
+        self.prev: Optional["_Node"] = None; self.next: Optional["_Node"] = None
+
+class _Level:
+    # Intrusive FIFO of order nodes: append/unlink are O(1) and keep priority.
+    __slots__ = ("idx", "head", "tail", "qty")
+
+    def __init__(self, idx: int):
+        self.idx = idx
+        self.head: Optional[_Node] = None
+        self.tail: Optional[_Node] = None
+        self.qty = 0
+
+    def append(self, node: _Node):
+        node.level = self; node.prev = self.tail; node.next = None
+        if self.tail: self.tail.next = node
+        else: self.head = node
+        self.tail = node
+        self.qty += node.order.qty
+
+    def unlink(self, node: _Node):
+        if node.prev: node.prev.next = node.next
+        else: self.head = node.next
+        if node.next: node.next.prev = node.prev
+        else: self.tail = node.prev
+        node.prev = node.next = None
+        self.qty -= node.order.qty
+
 class DepthLOB:
+    # Levels keyed by integer tick offset from a moving reference tick (_ref); per-side
+    # heaps of offsets (lazily pruned) give the touch without scanning keys, and each
+    # level carries its running qty. Market impact moves _ref, never the keys.
     def __init__(self, mid: float, tick: float, levels: int = 5):
         self.tick = tick
         self.levels = levels
-        self.bids: Dict[float, Deque[Order]] = defaultdict(deque)
-        self.asks: Dict[float, Deque[Order]] = defaultdict(deque)
-        self._order_index = {}
+        self.bids: Dict[int, _Level] = {}
+        self.asks: Dict[int, _Level] = {}
+        self._bid_heap: List[int] = []   # negated indices (max-heap)
+        self._ask_heap: List[int] = []
+        self._order_index: Dict[int, _Node] = {}
         self._next_id = 1
+        self._ref = int(round(mid / tick))
+        self._impact = 0.0   # sub-tick impact carried until it adds up to a whole tick
+        self.volume = {"BUY": 0, "SELL": 0}   # cumulative market-order volume filled, by aggressor side
+        b0 = self._to_idx(mid, "SELL") - 1; a0 = self._to_idx(mid, "BUY") + 1
         for i in range(levels):
-            p_bid = round(mid - (i+1)*tick, 2)
-            p_ask = round(mid + (i+1)*tick, 2)
-            self.place_limit(owner="EXT", side="BUY", price=p_bid, qty=200, ts=-1)
-            self.place_limit(owner="EXT", side="SELL", price=p_ask, qty=200, ts=-1)
+            self.place_limit(owner="EXT", side="BUY", price=self._price(b0 - i), qty=200, ts=-1)
+            self.place_limit(owner="EXT", side="SELL", price=self._price(a0 + i), qty=200, ts=-1)
 
     def next_id(self) -> int:
         oid = self._next_id; self._next_id += 1; return oid
 
+    def _to_idx(self, price: float, side: str) -> int:
+        # Off-grid prices snap passively: bids down, asks up.
+        x = price / self.tick
+        a = math.floor(x + 1e-9) if side == "BUY" else math.ceil(x - 1e-9)
+        return a - self._ref
+
+    def _price(self, idx: int) -> float:
+        return round((idx + self._ref) * self.tick, 9)
+
+    def _best_bid_idx(self) -> Optional[int]:
+        h = self._bid_heap
+        while h and -h[0] not in self.bids: heapq.heappop(h)
+        return -h[0] if h else None
+
+    def _best_ask_idx(self) -> Optional[int]:
+        h = self._ask_heap
+        while h and h[0] not in self.asks: heapq.heappop(h)
+        return h[0] if h else None
+
+    def _add_level(self, side: str, idx: int) -> _Level:
+        lvl = _Level(idx)
+        if side == "BUY":
+            self.bids[idx] = lvl; heapq.heappush(self._bid_heap, -idx)
+            if len(self._bid_heap) > 2*len(self.bids) + 16:
+                self._bid_heap = [-i for i in self.bids]; heapq.heapify(self._bid_heap)
+        else:
+            self.asks[idx] = lvl; heapq.heappush(self._ask_heap, idx)
+            if len(self._ask_heap) > 2*len(self.asks) + 16:
+                self._ask_heap = list(self.asks); heapq.heapify(self._ask_heap)
+        return lvl
+
     def best_bid(self) -> Optional[BookLevel]:
-        if not self.bids: return None
-        p = max(self.bids.keys())
-        q = sum(o.qty for o in self.bids[p])
-        return BookLevel(price=p, qty=q)
+        i = self._best_bid_idx()
+        if i is None: return None
+        return BookLevel(price=self._price(i), qty=self.bids[i].qty)
 
     def best_ask(self) -> Optional[BookLevel]:
-        if not self.asks: return None
-        p = min(self.asks.keys())
-        q = sum(o.qty for o in self.asks[p])
-        return BookLevel(price=p, qty=q)
+        i = self._best_ask_idx()
+        if i is None: return None
+        return BookLevel(price=self._price(i), qty=self.asks[i].qty)
 
     def mid(self) -> float:
-        bb = self.best_bid(); ba = self.best_ask()
-        if not bb or not ba: return 0.0
-        return round((bb.price + ba.price)/2, 2)
+        bi = self._best_bid_idx(); ai = self._best_ask_idx()
+        if bi is None or ai is None: return 0.0
+        return round((bi + ai + 2*self._ref) * self.tick / 2, 9)
 
     def place_limit(self, owner: str, side: str, price: float, qty: int, ts: int) -> int:
         oid = self.next_id()
         order = Order(order_id=oid, owner=owner, side=side, price=price, qty=qty, ts=ts)
-        book = self.bids if side == "BUY" else self.asks
-        book[price].append(order)
-        self._order_index[oid] = (side, price)
+        node = _Node(order, side)
+        self._insert(node, self._to_idx(price, side))
+        self._order_index[oid] = node
         return oid
 
+    def _insert(self, node: _Node, idx: int):
+        book = self.bids if node.side == "BUY" else self.asks
+        lvl = book.get(idx) or self._add_level(node.side, idx)
+        lvl.append(node)
+
+    def _remove(self, node: _Node):
+        lvl = node.level
+        lvl.unlink(node)
+        if lvl.head is None:
+            book = self.bids if node.side == "BUY" else self.asks
+            if book.get(lvl.idx) is lvl: book.pop(lvl.idx)
+
     def cancel(self, order_id: int) -> bool:
-        info = self._order_index.get(order_id)
-        if not info: return False
-        side, price = info
-        book = self.bids if side == "BUY" else self.asks
-        q = book.get(price)
-        if not q: return False
-        kept = deque(); removed = False
-        while q:
-            o = q.popleft()
-            if o.order_id == order_id and not removed:
-                removed = True; continue
-            kept.append(o)
-        if kept: book[price] = kept
-        else: book.pop(price, None)
-        self._order_index.pop(order_id, None)
-        return removed
-
-    def _match_queue(self, taker_side: str, qty: int, best_price: float):
+        node = self._order_index.pop(order_id, None)
+        if node is None: return False
+        self._remove(node)
+        return True
+
+    def amend(self, order_id: int, price: Optional[float] = None, qty: Optional[int] = None, ts: Optional[int] = None) -> bool:
+        # Size-down at the same price keeps queue priority; a reprice or size-up requeues at the back.
+        node = self._order_index.get(order_id)
+        if node is None: return False
+        o = node.order
+        new_qty = o.qty if qty is None else qty
+        if new_qty <= 0: return self.cancel(order_id)
+        lvl = node.level
+        new_idx = lvl.idx if price is None else self._to_idx(price, node.side)
+        if new_idx == lvl.idx and new_qty <= o.qty:
+            lvl.qty -= o.qty - new_qty; o.qty = new_qty
+            return True
+        self._remove(node)
+        if price is not None: o.price = price
+        o.qty = new_qty
+        if ts is not None: o.ts = ts
+        self._insert(node, new_idx)
+        return True
+
+    def order(self, order_id: int) -> Optional[Order]:
+        node = self._order_index.get(order_id)
+        return node.order if node else None
+
+    def same_price(self, order_id: int, price: float) -> bool:
+        # True if `price` (snapped passively) is the level the order rests at now.
+        node = self._order_index.get(order_id)
+        return node is not None and node.level.idx == self._to_idx(price, node.side)
+
+    def queue_ahead(self, order_id: int, include_better: bool = False) -> Optional[int]:
+        # Quantity that must trade before this order starts filling: earlier orders at its
+        # level, plus (include_better) all size resting at better prices on its side.
+        node = self._order_index.get(order_id)
+        if node is None: return None
+        ahead = 0; n = node.prev
+        while n:
+            ahead += n.order.qty; n = n.prev
+        if include_better:
+            idx = node.level.idx
+            if node.side == "BUY": ahead += sum(l.qty for i, l in self.bids.items() if i > idx)
+            else: ahead += sum(l.qty for i, l in self.asks.items() if i < idx)
+        return ahead
+
+    def _match_queue(self, taker_side: str, qty: int, idx: int):
         fills = []
         book = self.asks if taker_side == "BUY" else self.bids
-        q = book.get(best_price, deque())
+        lvl = book[idx]
+        price = self._price(idx)
         filled_here = 0
-        while qty > 0 and q:
-            maker = q[0]
+        node = lvl.head
+        while qty > 0 and node:
+            maker = node.order
             take = min(qty, maker.qty)
             maker.qty -= take; qty -= take; filled_here += take
-            fills.append(Order(order_id=maker.order_id, owner=maker.owner, side=maker.side, price=best_price, qty=take, ts=maker.ts))
+            fills.append(Order(order_id=maker.order_id, owner=maker.owner, side=maker.side, price=price, qty=take, ts=maker.ts))
             if maker.qty == 0:
-                q.popleft(); self._order_index.pop(maker.order_id, None)
-        if not q: book.pop(best_price, None)
-        else: book[best_price] = q
+                self._order_index.pop(maker.order_id, None)
+                node = node.next
+        lvl.qty -= filled_here
+        lvl.head = node
+        if node: node.prev = None
+        else: book.pop(idx, None)
         return fills, filled_here
 
-    def place_market(self, owner: str, side: str, qty: int):
+    def place_market(self, owner: str, side: str, qty: int, limit_price: Optional[float] = None):
+        # With limit_price the order only walks levels at or better than it (marketable limit).
         fills = []; remaining = qty
-        if side == "BUY":
-            while remaining > 0 and self.asks:
-                best_p = min(self.asks.keys())
-                f, took = self._match_queue("BUY", remaining, best_p)
-                fills += f; remaining -= took
-        else:
-            while remaining > 0 and self.bids:
-                best_p = max(self.bids.keys())
-                f, took = self._match_queue("SELL", remaining, best_p)
-                fills += f; remaining -= took
+        best = self._best_ask_idx if side == "BUY" else self._best_bid_idx
+        lim = None if limit_price is None else self._to_idx(limit_price, side)
+        while remaining > 0:
+            idx = best()
+            if idx is None: break
+            if lim is not None and (idx > lim if side == "BUY" else idx < lim): break
+            f, took = self._match_queue(side, remaining, idx)
+            fills += f; remaining -= took
+        self.volume[side] += qty - remaining
         return fills
 
+    def set_level(self, side: str, price: float, qty: int, owner: str = "EXT"):
+        # Replay: make `owner`'s resting size at a price equal qty. Growth joins the back of the
+        # queue and shrinkage is taken from the back-most of owner's orders, so orders queued
+        # ahead (e.g. the MM's) keep their place.
+        idx = self._to_idx(price, side)
+        lvl = (self.bids if side == "BUY" else self.asks).get(idx)
+        have = 0; node = lvl.head if lvl else None
+        while node:
+            if node.order.owner == owner: have += node.order.qty
+            node = node.next
+        d = qty - have
+        if d > 0:
+            self.place_limit(owner, side, self._price(idx), d, ts=-1); return
+        node = lvl.tail if lvl else None; d = -d
+        while d > 0 and node:
+            prev, o = node.prev, node.order
+            if o.owner == owner:
+                take = min(d, o.qty); d -= take
+                if take == o.qty: self.cancel(o.order_id)
+                else: o.qty -= take; lvl.qty -= take
+            node = prev
+
+    def cancel_owner(self, owner: str = "EXT"):
+        for oid in [oid for oid, n in self._order_index.items() if n.order.owner == owner]:
+            self.cancel(oid)
+
     def shift_prices(self, delta: float):
         if delta == 0.0: return
-        new_bids = defaultdict(deque)
-        for p, q in self.bids.items():
-            new_bids[round(p + delta, 2)] = q
-        new_asks = defaultdict(deque)
-        for p, q in self.asks.items():
-            new_asks[round(p + delta, 2)] = q
-        self.bids, self.asks = new_bids, new_asks
+        self._impact += delta
+        n = int(round(self._impact / self.tick))
+        if n:
+            self._ref += n; self._impact -= n * self.tick
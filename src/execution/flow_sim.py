@@ -1,14 +1,20 @@
-import random
+from typing import Callable, Optional
+import numpy as np
 from src.execution.depth_lob import DepthLOB
 
-def simulate_external_flow(lob: DepthLOB, alpha: float, intensity: float = 1.0, impact_kappa: float = 0.02, tick: float = 0.01):
+_MKT_QTY = np.array([20, 50, 100])
+_LIM_QTY = np.array([50, 100])
+
+def simulate_external_flow(lob: DepthLOB, alpha: float, intensity: float = 1.0, impact_kappa: float = 0.02, tick: float = 0.01,
+                           rng: Optional[np.random.Generator] = None):
+    rng = rng if rng is not None else np.random.default_rng()
     fills_total = []
     n_events = max(1, int(2 * intensity))
     for _ in range(n_events):
-        if random.random() < 0.7:
+        if rng.random() < 0.7:
             p_buy = 0.5 + 0.4 * max(alpha, 0.0)
-            side = "BUY" if random.random() < p_buy else "SELL"
-            qty = random.choice([20, 50, 100])
+            side = "BUY" if rng.random() < p_buy else "SELL"
+            qty = int(rng.choice(_MKT_QTY))
             fills = lob.place_market(owner="EXT", side=side, qty=qty)
             fills_total.extend(fills)
             direction = 1 if side == "BUY" else -1
@@ -17,11 +23,80 @@ def simulate_external_flow(lob: DepthLOB, alpha: float, intensity: float = 1.0,
         else:
             best_bid = lob.best_bid(); best_ask = lob.best_ask()
             if not best_bid or not best_ask: continue
-            side = random.choice(["BUY","SELL"])
+            side = "BUY" if rng.random() < 0.5 else "SELL"
             if side == "BUY":
-                price = round(best_bid.price - random.randint(1,2)*lob.tick, 2)
+                price = round(best_bid.price - int(rng.integers(1, 3))*lob.tick, 2)
             else:
-                price = round(best_ask.price + random.randint(1,2)*lob.tick, 2)
-            qty = random.choice([50, 100])
+                price = round(best_ask.price + int(rng.integers(1, 3))*lob.tick, 2)
+            qty = int(rng.choice(_LIM_QTY))
             lob.place_limit(owner="EXT", side=side, price=price, qty=qty, ts=-1)
     return fills_total
+
+class ExternalFlow:
+    # Same event mix as simulate_external_flow, but the uniforms behind every event
+    # are pre-drawn in blocks from a seeded Generator and consumed as array slices.
+    def __init__(self, seed: Optional[int] = None, rng: Optional[np.random.Generator] = None, block: int = 8192):
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.block = block
+        self._pos = 0; self._len = 0
+        self._kind = self._side = self._mkt_qty = self._lim_off = self._lim_qty = None
+
+    def _refill(self, n: int):
+        m = max(self.block, n); rng = self.rng
+        self._kind = rng.random(m)
+        self._side = rng.random(m)
+        self._mkt_qty = _MKT_QTY[rng.integers(0, len(_MKT_QTY), m)]
+        self._lim_off = rng.integers(1, 3, m)
+        self._lim_qty = _LIM_QTY[rng.integers(0, len(_LIM_QTY), m)]
+        self._pos = 0; self._len = m
+
+    def _draw(self, n: int):
+        if self._len - self._pos < n: self._refill(n)
+        a, b = self._pos, self._pos + n; self._pos = b
+        return self._kind[a:b], self._side[a:b], self._mkt_qty[a:b], self._lim_off[a:b], self._lim_qty[a:b]
+
+    def apply(self, lob: DepthLOB, alpha: float, n_calls: int = 1, intensity: float = 1.0,
+              impact_kappa: float = 0.02, tick: float = 0.01,
+              on_fills: Optional[Callable[[list], None]] = None):
+        # Equivalent to n_calls calls of simulate_external_flow. If on_fills is given it is
+        # invoked after each market order (so fill handlers see the book as it was then);
+        # otherwise fills are collected and returned.
+        n = n_calls * max(1, int(2 * intensity))
+        if n <= 0: return []
+        kind, side_u, mkt_qty, lim_off, lim_qty = self._draw(n)
+        is_mkt = kind < 0.7
+        buy = np.where(is_mkt, side_u < 0.5 + 0.4 * max(alpha, 0.0), side_u < 0.5)
+        return self._run(lob, is_mkt, buy, np.where(is_mkt, mkt_qty, lim_qty), lim_off, impact_kappa, tick, on_fills)
+
+    def apply_counts(self, lob: DepthLOB, n_buy: int, n_sell: int, n_limit: int,
+                     impact_kappa: float = 0.02, tick: float = 0.01,
+                     on_fills: Optional[Callable[[list], None]] = None):
+        # Market-order counts come from an external arrival model (e.g. MultiHawkes); sizes,
+        # limit-order sides/offsets and the interleaving of the events are drawn here.
+        n = int(n_buy) + int(n_sell) + int(n_limit)
+        if n <= 0: return []
+        _, side_u, mkt_qty, lim_off, lim_qty = self._draw(n)
+        is_mkt = np.zeros(n, dtype=bool); is_mkt[:n_buy + n_sell] = True
+        buy = np.zeros(n, dtype=bool); buy[:n_buy] = True; buy[n_buy + n_sell:] = side_u[n_buy + n_sell:] < 0.5
+        order = self.rng.permutation(n)
+        is_mkt, buy = is_mkt[order], buy[order]
+        return self._run(lob, is_mkt, buy, np.where(is_mkt, mkt_qty, lim_qty), lim_off, impact_kappa, tick, on_fills)
+
+    def _run(self, lob, is_mkt, buy, qty, lim_off, impact_kappa, tick, on_fills):
+        fills_total = []
+        impact = np.where(buy, 1.0, -1.0) * impact_kappa * (qty / 100.0) * tick
+        place_market, place_limit, shift = lob.place_market, lob.place_limit, lob.shift_prices
+        best_bid, best_ask, lt = lob.best_bid, lob.best_ask, lob.tick
+        for m, b, q, off, d in zip(is_mkt.tolist(), buy.tolist(), qty.tolist(), lim_off.tolist(), impact.tolist()):
+            if m:
+                fills = place_market(owner="EXT", side="BUY" if b else "SELL", qty=q)
+                if fills:
+                    if on_fills: on_fills(fills)
+                    else: fills_total.extend(fills)
+                shift(d)
+            else:
+                bb = best_bid(); ba = best_ask()
+                if not bb or not ba: continue
+                if b: place_limit(owner="EXT", side="BUY", price=bb.price - off*lt, qty=q, ts=-1)
+                else: place_limit(owner="EXT", side="SELL", price=ba.price + off*lt, qty=q, ts=-1)
+        return fills_total
@@ -1,9 +1,13 @@
+import math
+import numpy as np
 from dataclasses import dataclass
-from typing import Optional, Callable
-from src.pricing.spread_adjuster import half_spread, realized_vol
+from typing import Optional, Tuple
+from src.pricing.spread_adjuster import half_spread
 from src.pricing.avellaneda_stoikov import optimal_quotes
 from src.execution.depth_lob import DepthLOB
 from src.execution.risk_manager import RiskManager
+from src.execution.portfolio_state import PortfolioState
+from src.sim.recorder import ColumnarRecorder
 
 @dataclass
 class QuoteIds:
@@ -16,10 +20,13 @@ class MarketMakerDepth:
                  tx_fee_bps: float = 0.5, skew_k: float = 0.6,
                  use_avellaneda: bool = True, as_gamma: float = 0.001, as_k: float = 1.5, as_T: float = 1.0,
                  maker_fee_bps: float = -0.05,
-                 exec_logger: Optional[Callable[[dict], None]] = None,
-                 venue_name: str = "?",
+                 exec_recorder: Optional[ColumnarRecorder] = None,
+                 venue_name: str = "?", symbol: Optional[str] = None,
                  adaptive_tick: bool = True, min_tick: float = 0.005, max_tick: float = 0.05,
-                 vol_low: float = 0.0005, vol_high: float = 0.01):
+                 vol_low: float = 0.0005, vol_high: float = 0.01,
+                 vol_window: int = 50, history_len: int = 512, keep_full_history: bool = False,
+                 keep_queue: bool = True, keep_min_frac: float = 0.5, flow_ewma: float = 0.1,
+                 state: Optional[PortfolioState] = None, book: int = 0):
         self.lob = lob
         self.risk = risk
         self.size = size
@@ -34,18 +41,60 @@ class MarketMakerDepth:
         self.use_avellaneda = use_avellaneda
         self.as_gamma = as_gamma; self.as_k = as_k; self.as_T = as_T
         self.maker_fee_bps = maker_fee_bps
-        self.exec_logger = exec_logger
+        self.exec_recorder = exec_recorder
         self.venue_name = venue_name
+        self.symbol = symbol
         self.adaptive_tick = adaptive_tick
         self.min_tick = min_tick; self.max_tick = max_tick
         self.vol_low = vol_low; self.vol_high = vol_high
 
-        self.inv = 0
-        self.realized = 0.0
-        self.pnl = 0.0
-        self.last_mid = self.lob.mid()
-        self.mid_history = [self.last_mid]
+        # Position, PnL, mids and vol live in slot `book` of a PortfolioState shared with the
+        # other books of the run; a standalone MM gets a one-book state of its own.
+        if state is None:
+            state = PortfolioState([symbol or "?"], [venue_name], vol_window=vol_window, history_len=history_len,
+                                   keep_full_history=keep_full_history, flow_ewma=flow_ewma)
+            book = 0
+        self.state = state; self.k = book; self.i = int(state.symbol_of[book])
+        state.init_book(book, self.lob.mid(), (self.lob.volume["BUY"], self.lob.volume["SELL"]))
         self.qids = QuoteIds(None, None)
+        # Requoting at an unchanged price keeps the resting order (and its queue place) unless
+        # it has been filled down below keep_min_frac of the wanted size.
+        self.keep_queue = keep_queue; self.keep_min_frac = keep_min_frac
+        self.book_ops = 0; self.quotes_kept = 0
+        # Called as (venue, side, qty, price, mid, spread_capture, rebate) for every maker fill,
+        # mid being the venue mid the spread capture is measured against (0, and no capture,
+        # while one side of the book is empty).
+        self.fill_listener = None
+        self.inflight = (0, 0)   # sizes decided but not yet on the book (venue latency)
+
+    # inv/realized/pnl are this venue's share; net_inv is the symbol's position over all
+    # venues, which quoting skew, size caps and hedging use.
+    @property
+    def inv(self) -> int:
+        return int(self.state.inv[self.k])
+
+    @property
+    def net_inv(self) -> int:
+        return int(self.state.pos[self.i])
+
+    @property
+    def realized(self) -> float:
+        return float(self.state.realized[self.k])
+
+    @property
+    def pnl(self) -> float:
+        return float(self.state.pnl[self.k])
+
+    @property
+    def last_mid(self) -> float:
+        return float(self.state.last_mid[self.k])
+
+    @property
+    def mid_history(self) -> np.ndarray:
+        return self.state.mid_history(self.k)
+
+    def vol(self) -> float:
+        return float(self.state.vol(self.k))
 
     def _fee(self, qty: int, price: float, bps: float) -> float:
         return abs(qty) * price * (bps * 1e-4)
@@ -62,79 +111,115 @@ class MarketMakerDepth:
         x = (v - self.vol_low) / max(1e-9, (self.vol_high - self.vol_low))
         return round(self.min_tick + x * (self.max_tick - self.min_tick), 4)
 
-    def make_quote(self, alpha: float, ts: int):
-        mid = self.lob.mid()
-        vol = realized_vol(self.mid_history, window=50)
-        eff_tick = self._effective_tick(vol)
+    def make_quote(self, alpha: float, ts: int, t: float = 0.0):
+        self.send_quotes(self.quote_targets(alpha, t), ts)
 
+    def quote_inputs(self, alpha: float, t: float = 0.0):
+        # Per-book inputs of optimal_quotes_batch: (center, inventory, sigma, gamma, k, T, tick, t).
+        vol = self.vol()
+        return (self.lob.mid() + alpha*0.05, self.net_inv, max(1e-6, vol * 0.05),
+                self.as_gamma, self.as_k, self.as_T, self._effective_tick(vol), t)
+
+    def sizes(self, n_quotes: int = 1, committed: Tuple[int, int] = (0, 0)):
+        # Bid/ask sizes against the symbol's net position, sharing the room on each side with
+        # the other n_quotes - 1 venues being quoted and `committed` size working elsewhere.
+        inv = self.net_inv
+        self.inflight = (self.risk.capped_size(inv, self.size, committed[0], n_quotes),
+                         self.risk.capped_size(-inv, self.size, committed[1], n_quotes))
+        return self.inflight
+
+    def working(self) -> Tuple[int, int]:
+        # Bid/ask size this MM can still be filled for: resting, or about to replace it.
+        out = []
+        for oid, pending in zip((self.qids.bid_id, self.qids.ask_id), self.inflight):
+            o = self.lob.order(oid) if oid else None
+            out.append(max(o.qty if o else 0, pending))
+        return out[0], out[1]
+
+    def quote_targets(self, alpha: float, t: float = 0.0, sizes: Optional[Tuple[int, int]] = None):
+        # (bid, ask, size_bid, size_ask) from the current book and inventory; send_quotes puts
+        # them on the book, possibly later when venue latency is simulated.
         if self.use_avellaneda:
-            sigma = max(1e-6, vol * 0.05)
-            bid, ask, r, half = optimal_quotes(mid + alpha*0.05, self.inv, sigma, self.as_gamma, self.as_k, self.as_T, eff_tick)
+            bid, ask, r, half = optimal_quotes(*self.quote_inputs(alpha, t))
         else:
-            h = half_spread(mid, self.inv, self.inv_limit, self.base_spread_bps, vol=vol)
+            mid = self.lob.mid()
+            h = half_spread(mid, self.net_inv, self.inv_limit, self.base_spread_bps, vol=self.vol())
             bid = round(mid - h, 2); ask = round(mid + h, 2)
+        return (bid, ask) + (sizes if sizes is not None else self.sizes())
+
+    def send_quotes(self, targets, ts: int):
+        bid, ask, size_bid, size_ask = targets
+        self.inflight = (0, 0)
+        self.qids = QuoteIds(self._requote(self.qids.bid_id, "BUY", bid, size_bid, ts),
+                             self._requote(self.qids.ask_id, "SELL", ask, size_ask, ts))
+
+    def _requote(self, oid: Optional[int], side: str, price: float, size: int, ts: int) -> Optional[int]:
+        if size <= 0:
+            if oid and self.lob.cancel(oid): self.book_ops += 1
+            return None
+        if oid and self.keep_queue and self.lob.same_price(oid, price):
+            o = self.lob.order(oid)
+            if o.qty >= self.keep_min_frac * size:
+                if o.qty > size: self.lob.amend(oid, qty=size); self.book_ops += 1   # size-down keeps priority
+                else: self.quotes_kept += 1
+                return oid
+        self.book_ops += 1
+        if oid and self.keep_queue and self.lob.amend(oid, price=price, qty=size, ts=ts): return oid
+        if oid: self.lob.cancel(oid)   # without keep_queue every requote goes to the back
+        return self.lob.place_limit("MM", side, price, size, ts)
 
-        self.cancel_quotes()
-        size_bid = self.risk.capped_size(self.inv, self.size)
-        size_ask = self.risk.capped_size(-self.inv, self.size)
-        if size_bid > 0: self.qids.bid_id = self.lob.place_limit("MM", "BUY", bid, size_bid, ts)
-        if size_ask > 0: self.qids.ask_id = self.lob.place_limit("MM", "SELL", ask, size_ask, ts)
+    def fill_probability(self, horizon: float = 1.0) -> Tuple[float, float]:
+        # P(bid, ask quote starts filling within `horizon` steps), taking market volume against
+        # each side as exponential with the EWMA per-step mean: P = exp(-ahead / (rate * horizon)),
+        # where `ahead` is the size queued in front of the quote including better levels.
+        out = []
+        for oid, aggressor in ((self.qids.bid_id, 1), (self.qids.ask_id, 0)):
+            ahead = self.lob.queue_ahead(oid, include_better=True) if oid else None
+            rate = float(self.state.flow_rate[self.k, aggressor]) * horizon
+            out.append(0.0 if ahead is None or rate <= 0.0 else math.exp(-ahead / rate))
+        return out[0], out[1]
 
     def on_fills(self, fills):
         for f in fills:
             if f.owner == "MM":
-                mid = self.lob.mid()
+                mid = self.lob.mid()   # 0 while one side is empty: no capture to measure
                 if f.side == "SELL":
-                    self.inv -= f.qty
                     cash = f.qty * f.price
                     rebate = self._fee(f.qty, f.price, self.maker_fee_bps)
-                    self.realized += cash + rebate
-                    if self.exec_logger:
-                        self.exec_logger({
-                            "venue": self.venue_name, "role": "maker", "side": "SELL", "qty": f.qty,
-                            "price": f.price, "mid": mid, "fee_bps": self.maker_fee_bps, "fee": rebate,
-                            "spread_capture": (f.price - mid) * f.qty, "symbol": None
-                        })
+                    self.state.fill(self.k, -f.qty, cash + rebate)
+                    capture = (f.price - mid) * f.qty if mid > 0.0 else 0.0
+                    if self.exec_recorder is not None:
+                        self.exec_recorder.append_row((self.venue_name, "maker", "SELL", f.qty, f.price, mid,
+                                                       self.maker_fee_bps, rebate, capture, self.symbol))
                 else:
-                    self.inv += f.qty
                     cost = f.qty * f.price
                     rebate = self._fee(f.qty, f.price, self.maker_fee_bps)
-                    self.realized -= cost - rebate
-                    if self.exec_logger:
-                        self.exec_logger({
-                            "venue": self.venue_name, "role": "maker", "side": "BUY", "qty": f.qty,
-                            "price": f.price, "mid": mid, "fee_bps": self.maker_fee_bps, "fee": rebate,
-                            "spread_capture": (mid - f.price) * f.qty, "symbol": None
-                        })
+                    self.state.fill(self.k, f.qty, rebate - cost)
+                    capture = (mid - f.price) * f.qty if mid > 0.0 else 0.0
+                    if self.exec_recorder is not None:
+                        self.exec_recorder.append_row((self.venue_name, "maker", "BUY", f.qty, f.price, mid,
+                                                       self.maker_fee_bps, rebate, capture, self.symbol))
+                if self.fill_listener is not None:
+                    self.fill_listener(self.venue_name, f.side, f.qty, f.price, mid, capture, rebate)
 
     def apply_taker_fills(self, fills, taker_fee_bps: float):
         for f in fills:
             mid = self.lob.mid()
             if f.side == "SELL":
-                self.inv += f.qty
                 cost = f.qty * f.price
                 fee = self._fee(f.qty, f.price, taker_fee_bps)
-                self.realized -= cost + fee
-                if self.exec_logger:
-                    self.exec_logger({
-                        "venue": self.venue_name, "role": "taker", "side": "BUY", "qty": f.qty,
-                        "price": f.price, "mid": mid, "fee_bps": taker_fee_bps, "fee": -fee,
-                        "spread_capture": 0.0, "symbol": None
-                    })
+                self.state.fill(self.k, f.qty, -(cost + fee))
+                if self.exec_recorder is not None:
+                    self.exec_recorder.append_row((self.venue_name, "taker", "BUY", f.qty, f.price, mid,
+                                                   taker_fee_bps, -fee, 0.0, self.symbol))
             else:
-                self.inv -= f.qty
                 cash = f.qty * f.price
                 fee = self._fee(f.qty, f.price, taker_fee_bps)
-                self.realized += cash - fee
-                if self.exec_logger:
-                    self.exec_logger({
-                        "venue": self.venue_name, "role": "taker", "side": "SELL", "qty": f.qty,
-                        "price": f.price, "mid": mid, "fee_bps": taker_fee_bps, "fee": -fee,
-                        "spread_capture": 0.0, "symbol": None
-                    })
+                self.state.fill(self.k, -f.qty, cash - fee)
+                if self.exec_recorder is not None:
+                    self.exec_recorder.append_row((self.venue_name, "taker", "SELL", f.qty, f.price, mid,
+                                                   taker_fee_bps, -fee, 0.0, self.symbol))
 
     def mark_to_market(self):
-        mid = self.lob.mid()
-        self.pnl = self.realized + self.inv * mid
-        self.last_mid = mid
-        self.mid_history.append(mid)
+        v = self.lob.volume
+        self.state.mark([self.lob.mid()], [[v["BUY"], v["SELL"]]], idx=[self.k])
@@ -0,0 +1,150 @@
+from typing import List, Optional, Sequence
+import numpy as np
+
+class PortfolioState:
+    # Struct-of-arrays state for every (symbol, venue) book, laid out symbol-major
+    # (book = i_symbol * n_venues + i_venue). MarketMakerDepth objects are views onto one
+    # slot each; marking, vol, VaR inputs and per-symbol aggregates are array operations.
+    # Vol is a windowed Welford over clipped returns (streaming realized_vol) for all books at once.
+    # The per-symbol ledger (pos, cash, mark_px) is the position shared by all of a symbol's
+    # venues: fill() updates it together with the venue slot, so net inventory and marked
+    # PnL are single reads.
+    def __init__(self, symbols: Sequence[str], venues: Sequence[str], vol_window: int = 50,
+                 history_len: int = 512, keep_full_history: bool = False, flow_ewma: float = 0.1,
+                 refresh: int = 4096):
+        self.symbols = list(symbols); self.venues = list(venues)
+        S, V = len(self.symbols), len(self.venues); n = S * V
+        self.n_symbols, self.n_venues, self.n = S, V, n
+        self.symbol_of = np.repeat(np.arange(S), V)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.inv = np.zeros(n, dtype=np.int64)
+        self.realized = np.zeros(n)
+        self.pnl = np.zeros(n)
+        self.last_mid = np.zeros(n)
+        self.prev_mid = np.zeros(n)
+        # per-symbol ledger; mark_px is the mean of the symbol's positive venue mids
+        self.pos = np.zeros(S, dtype=np.int64)
+        self.cash = np.zeros(S)
+        self.mark_px = np.zeros(S); self.prev_mark_px = np.zeros(S)
+        # fill-probability inputs: EWMA per-step market volume by aggressor side (0 buy, 1 sell)
+        self.flow_ewma = flow_ewma
+        self.flow_rate = np.zeros((n, 2))
+        self._vol_seen = np.zeros((n, 2))
+        # rolling vol
+        self.window = vol_window; self.refresh = refresh
+        self._rets = np.zeros((n, vol_window))
+        self._pos = np.zeros(n, dtype=np.int64); self._cnt = np.zeros(n, dtype=np.int64)
+        self._upd = np.zeros(n, dtype=np.int64)
+        self._mean = np.zeros(n); self._m2 = np.zeros(n)
+        self._prev = np.full(n, np.nan)
+        # mid history rings, one column per book with its own write position, so marking a
+        # subset of books records just their mids
+        self.history_len = history_len; self.keep_full_history = keep_full_history
+        self._hist = np.zeros((history_len, n))
+        self._hpos = np.zeros(n, dtype=np.int64); self._hn = np.zeros(n, dtype=np.int64)
+        self._spilled: List[List[np.ndarray]] = [[] for _ in range(n)]
+        self._open = np.zeros(n)
+
+    def book(self, symbol: str, venue: str) -> int:
+        return self.symbol_index[symbol] * self.n_venues + self.venues.index(venue)
+
+    def symbol_books(self, symbol: str) -> slice:
+        i = self.symbol_index[symbol] * self.n_venues
+        return slice(i, i + self.n_venues)
+
+    def init_book(self, k: int, mid: float, volumes=(0.0, 0.0)):
+        self._open[k] = mid; self.last_mid[k] = mid; self.prev_mid[k] = mid
+        self._vol_seen[k] = volumes
+        self._update_vol(np.array([k]), np.array([mid]))
+        i = self.symbol_of[k]
+        self._mark_symbols(np.array([i])); self.prev_mark_px[i] = self.mark_px[i]
+
+    def fill(self, k: int, qty: int, cash: float):
+        # Signed fill on book k: qty > 0 bought, cash the signed cash flow including fees.
+        i = self.symbol_of[k]
+        self.inv[k] += qty; self.realized[k] += cash
+        self.pos[i] += qty; self.cash[i] += cash
+
+    def symbol_pnl(self, i: int) -> float:
+        return float(self.cash[i] + self.pos[i] * self.mark_px[i])
+
+    def _mark_symbols(self, syms):
+        lm = self.by_symbol(self.last_mid)[syms]
+        ok = lm > 0.0; cnt = ok.sum(axis=1)
+        px = np.where(cnt > 0, (lm * ok).sum(axis=1) / np.maximum(cnt, 1), self.mark_px[syms])
+        self.prev_mark_px[syms] = self.mark_px[syms]; self.mark_px[syms] = px
+
+    def _update_vol(self, idx: np.ndarray, prices: np.ndarray):
+        p = np.clip(np.nan_to_num(prices, nan=1.0, posinf=1.0, neginf=1.0), 0.01, 1e6)
+        prev = self._prev[idx]; self._prev[idx] = p
+        has = ~np.isnan(prev)
+        idx, p, prev = idx[has], p[has], prev[has]
+        if len(idx) == 0: return
+        x = np.clip((p - prev) / prev, -0.1, 0.1)
+        pos, cnt, mean, m2 = self._pos[idx], self._cnt[idx], self._mean[idx], self._m2[idx]
+        full = cnt == self.window
+        if full.any():
+            y = self._rets[idx, pos]
+            c = np.where(full, cnt - 1, cnt)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                d = y - mean; mean_r = mean - d / c; m2_r = m2 - d * (y - mean_r)
+            empty = full & (c == 0)
+            mean = np.where(full, np.where(empty, 0.0, mean_r), mean)
+            m2 = np.where(full, np.where(empty, 0.0, m2_r), m2)
+            cnt = c
+        self._rets[idx, pos] = x
+        self._pos[idx] = (pos + 1) % self.window
+        cnt = cnt + 1
+        d = x - mean; mean = mean + d / cnt; m2 = m2 + d * (x - mean)
+        self._cnt[idx] = cnt; self._mean[idx] = mean; self._m2[idx] = m2
+        self._upd[idx] += 1
+        due = idx[self._upd[idx] % self.refresh == 0]
+        for k in due.tolist():
+            r = self._rets[k] if self._cnt[k] == self.window else self._rets[k, :self._cnt[k]]
+            self._mean[k] = r.mean(); self._m2[k] = ((r - self._mean[k])**2).sum()
+
+    def vol(self, idx=slice(None)) -> np.ndarray:
+        cnt = self._cnt[idx]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sigma = np.sqrt(np.maximum(self._m2[idx], 0.0) / cnt) * np.sqrt(252)
+        return np.where(cnt == 0, 1e-6, np.maximum(sigma, 1e-6))
+
+    def mark(self, mids: np.ndarray, volumes: Optional[np.ndarray] = None, idx=None):
+        # Mark books `idx` (default: all) to `mids`; volumes is (len, 2) cumulative market
+        # volume by aggressor side, for the fill-rate EWMA.
+        whole = idx is None
+        idx = np.arange(self.n) if whole else np.asarray(idx)
+        mids = np.asarray(mids, dtype=float)
+        self.pnl[idx] = self.realized[idx] + self.inv[idx] * mids
+        self.prev_mid[idx] = self.last_mid[idx]; self.last_mid[idx] = mids
+        self._mark_symbols(slice(None) if whole else np.unique(self.symbol_of[idx]))
+        self._update_vol(idx, mids)
+        if volumes is not None:
+            v = np.asarray(volumes, dtype=float)
+            self.flow_rate[idx] += self.flow_ewma * ((v - self._vol_seen[idx]) - self.flow_rate[idx])
+            self._vol_seen[idx] = v
+        if self.history_len:
+            wrap = idx[self._hpos[idx] == self.history_len]
+            if len(wrap):
+                if self.keep_full_history:
+                    for k in wrap.tolist(): self._spilled[k].append(self._hist[:, k].copy())
+                self._hpos[wrap] = 0
+            self._hist[self._hpos[idx], idx] = mids; self._hpos[idx] += 1; self._hn[idx] += 1
+
+    def mid_history(self, k: int) -> np.ndarray:
+        # Opening mid and marked mids of book k, oldest first; once more than history_len
+        # marks exist only the last history_len are kept (all of them with keep_full_history).
+        L, p, m = self.history_len, self._hpos[k], self._hn[k]
+        if self._spilled[k]:   # spilled chunks are the full wraps; the ring holds what followed
+            rows = np.concatenate(self._spilled[k] + [self._hist[:p, k]])
+        elif m < L: rows = self._hist[:m, k]
+        else: rows = np.concatenate([self._hist[p:, k], self._hist[:p, k]])
+        if m <= L or self.keep_full_history: rows = np.concatenate(([self._open[k]], rows))
+        return rows
+
+    # per-symbol views (shape (n_symbols, n_venues) or reductions over venues)
+    def by_symbol(self, arr: np.ndarray) -> np.ndarray:
+        return arr.reshape(self.n_symbols, self.n_venues)
+
+    def symbol_total(self, arr: np.ndarray) -> np.ndarray:
+        return self.by_symbol(arr).sum(axis=1)
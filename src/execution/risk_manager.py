@@ -2,6 +2,9 @@ class RiskManager:
     def __init__(self, inv_limit: int):
         self.inv_limit = inv_limit
 
-    def capped_size(self, inv: int, base_size: int) -> int:
-        room = self.inv_limit - abs(inv)
-        return max(0, min(base_size, room))
+    def capped_size(self, inv: int, base_size: int, committed: int = 0, n_quotes: int = 1) -> int:
+        # Size of each of n_quotes same-side quotes, for a position `inv` signed in the quote's
+        # direction (net for a bid, -net for an ask). With `committed` size already working on
+        # that side elsewhere, all of it filling leaves |position| <= inv_limit.
+        room = self.inv_limit - inv - committed
+        return max(0, min(base_size, room // max(1, n_quotes)))
@@ -1,6 +1,8 @@
+import math
 from collections import deque
 from dataclasses import dataclass
-from typing import Dict
+from typing import Dict, Optional
+import numpy as np
 
 @dataclass
 class VenueStats:
@@ -10,33 +12,109 @@ class VenueStats:
     maker_rebate: float = 0.0
     adverse_moves: float = 0.0
 
+@dataclass
+class _PendingFill:
+    due: int
+    venue: str
+    sign: int            # +1 we bought, -1 we sold
+    qty: int
+    mark: float          # venue mid when the fill happened (0: one-sided book)
+    spread_capture: float
+    notional: float
+    maker_rebate: float
+
 class SmartVenueSelector:
-    def __init__(self, lookback=200):
-        self.lookback = lookback
+    # Ranks venues by the mean markout-adjusted edge of their last `lookback` maker fills:
+    # spread capture + rebate - adverse move, where the adverse move is the change of the
+    # venue's mid against the fill `markout_steps` settle() calls after it. Means are running
+    # sums over the window (rebuilt every `refresh` updates), and the ranking is cached until
+    # the next update, so scoring a quote does no per-fill work.
+    # mode: "greedy" (highest mean), "ucb" (mean + c * scale * sqrt(2 ln N / n), unseen
+    # venues first) or "thompson" (rank by a draw from N(mean, sd^2 / n) per venue), where
+    # scale/sd come from the pooled edge variance.
+    def __init__(self, lookback=200, mode: str = "greedy", markout_steps: int = 5, ucb_c: float = 1.0,
+                 rng: Optional[np.random.Generator] = None, refresh: int = 4096):
+        if mode not in ("greedy", "ucb", "thompson"):
+            raise ValueError(f"Unknown selector mode: {mode!r} (expected 'greedy', 'ucb' or 'thompson')")
+        self.lookback = lookback; self.mode = mode
+        self.markout_steps = markout_steps; self.ucb_c = ucb_c
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.refresh = refresh
         self.history: Dict[str, deque] = {}
         self.stats: Dict[str, VenueStats] = {}
+        self._sum: Dict[str, float] = {}; self._sq: Dict[str, float] = {}
+        self.pending: deque = deque()
+        self.t = 0; self.n_updates = 0
+        self._cache: Dict[tuple, list] = {}
+
+    def on_fill(self, venue: str, side: str, qty: int, price: float, mid: float,
+                spread_capture: float, maker_rebate: float):
+        # Queue a maker fill with the venue mid at the fill; it is scored once its markout
+        # horizon has passed.
+        self.pending.append(_PendingFill(self.t + self.markout_steps, venue, 1 if side == "BUY" else -1, qty,
+                                         mid, spread_capture, abs(qty) * price, maker_rebate))
+        if self.markout_steps <= 0: self.settle({venue: mid}, advance=False)
+
+    def settle(self, mids: Dict[str, float], advance: bool = True):
+        # Advance the markout clock one step and score every due fill against its venue's mid.
+        if advance: self.t += 1
+        q = self.pending
+        while q and q[0].due <= self.t:
+            p = q.popleft()
+            mark = mids.get(p.venue, 0.0)
+            adverse = p.sign * (p.mark - mark) * p.qty if mark > 0.0 and p.mark > 0.0 else 0.0
+            # no mid at the fill (one-sided book): neither capture nor markout is measurable
+            capture = p.spread_capture if p.mark > 0.0 else 0.0
+            self.update_from_fill(p.venue, capture, p.notional, p.maker_rebate, adverse)
 
     def update_from_fill(self, venue: str, spread_capture: float, notional: float, maker_rebate: float, adverse: float):
         if venue not in self.stats:
             self.stats[venue] = VenueStats()
             self.history[venue] = deque(maxlen=self.lookback)
+            self._sum[venue] = 0.0; self._sq[venue] = 0.0
         st = self.stats[venue]
         st.fills += 1; st.notional += notional
         st.spread_capture += spread_capture; st.maker_rebate += maker_rebate; st.adverse_moves += adverse
         ev = spread_capture + maker_rebate - adverse
-        self.history[venue].append(ev)
+        h = self.history[venue]
+        if len(h) == h.maxlen:
+            old = h[0]; self._sum[venue] -= old; self._sq[venue] -= old * old
+        h.append(ev); self._sum[venue] += ev; self._sq[venue] += ev * ev
+        self.n_updates += 1
+        if self.n_updates % self.refresh == 0:
+            for v, hv in self.history.items():
+                self._sum[v] = float(sum(hv)); self._sq[v] = float(sum(x * x for x in hv))
+        self._cache.clear()
 
     def expected_value(self, venue: str) -> float:
-        if venue not in self.history or len(self.history[venue]) == 0:
-            return 0.0
-        h = self.history[venue]
-        return sum(h) / len(h)
+        h = self.history.get(venue)
+        return self._sum[venue] / len(h) if h else 0.0
+
+    def _pooled_sd(self) -> float:
+        n = sum(len(h) for h in self.history.values())
+        if n < 2: return 0.0
+        s = sum(self._sum.values()); sq = sum(self._sq.values())
+        return math.sqrt(max(sq / n - (s / n) ** 2, 0.0))
+
+    def _scores(self, names):
+        mean = [self.expected_value(v) for v in names]
+        if self.mode == "greedy": return mean
+        n = [len(self.history.get(v, ())) for v in names]
+        sd = self._pooled_sd()
+        if self.mode == "ucb":
+            log_n = math.log(max(sum(n), 1))
+            return [math.inf if c == 0 else m + self.ucb_c * sd * math.sqrt(2.0 * log_n / c) for m, c in zip(mean, n)]
+        return (np.asarray(mean) + self.rng.standard_normal(len(names)) * sd / np.sqrt(np.maximum(n, 1))).tolist()
 
     def pick_venues(self, venues: Dict[str, object], k: int = None):
-        scores = [(v.name, self.expected_value(v.name)) for v in venues.values()]
-        scores.sort(key=lambda x: x[1], reverse=True)
-        if not scores:
+        names = [v.name for v in venues.values()]
+        if not names:
             return list(venues.keys())
-        if k is None or k >= len(scores):
-            return [s for s,_ in scores]
-        return [s for s,_ in scores[:k]]
+        key = (tuple(names), k)
+        if self.mode != "thompson" and key in self._cache:
+            return self._cache[key]
+        scores = self._scores(names)
+        order = [names[i] for i in sorted(range(len(names)), key=lambda i: scores[i], reverse=True)]
+        out = order if k is None or k >= len(order) else order[:k]
+        self._cache[key] = out
+        return out
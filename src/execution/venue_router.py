@@ -1,9 +1,13 @@
 from dataclasses import dataclass
-from typing import Dict, Callable, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
 from src.execution.depth_lob import DepthLOB
 from src.execution.market_maker_depth import MarketMakerDepth
 from src.execution.risk_manager import RiskManager
+from src.execution.portfolio_state import PortfolioState
 from src.execution.smart_router import SmartVenueSelector
+from src.pricing.avellaneda_stoikov import optimal_quotes_batch
+from src.sim.recorder import ColumnarRecorder
 
 @dataclass
 class Venue:
@@ -17,54 +21,136 @@ class Venue:
 class MarketMakerRouter:
     def __init__(self, symbol: str, venues_conf, start_price: float, tick: float,
                  quote_size: int, inv_limit: int, mm_kwargs: dict,
-                 exec_logger: Optional[Callable[[dict], None]] = None,
-                 top_k: int = None):
+                 exec_recorder: Optional[ColumnarRecorder] = None,
+                 top_k: int = None, books: Optional[Dict[str, DepthLOB]] = None,
+                 state: Optional[PortfolioState] = None, selector: Optional[SmartVenueSelector] = None):
         self.symbol = symbol
         self.venues: Dict[str, Venue] = {}
-        self.selector = SmartVenueSelector(lookback=200)
+        self.selector = selector if selector is not None else SmartVenueSelector(lookback=200)
         shared_risk = RiskManager(inv_limit)
+        if state is None:
+            state = PortfolioState([symbol], [v.name for v in venues_conf],
+                                   **{k: mm_kwargs[k] for k in ("vol_window", "history_len", "keep_full_history", "flow_ewma") if k in mm_kwargs})
+        self.state = state
+        self.books = state.symbol_books(symbol); self.i = state.symbol_index[symbol]
         for v in venues_conf:
-            lob = DepthLOB(start_price, tick, levels=5)
+            lob = books[v.name] if books and v.name in books else DepthLOB(start_price, tick, levels=5)
             mm = MarketMakerDepth(lob, shared_risk, quote_size, inv_limit, **mm_kwargs,
-                                  maker_fee_bps=v.maker_fee_bps, exec_logger=exec_logger, venue_name=v.name)
+                                  maker_fee_bps=v.maker_fee_bps, exec_recorder=exec_recorder,
+                                  venue_name=v.name, symbol=symbol, state=state, book=state.book(symbol, v.name))
+            mm.fill_listener = self._on_maker_fill
             self.venues[v.name] = Venue(v.name, lob, mm, v.maker_fee_bps, v.taker_fee_bps, v.latency_ms)
         self.top_k = top_k
+        self._hedge_venue = min(self.venues.values(), key=lambda x: x.taker_fee_bps)
 
     def inventory(self) -> int:
-        return next(iter(self.venues.values())).mm.inv
+        # Net position over all venues, from the shared ledger.
+        return int(self.state.pos[self.i])
 
     def pnl(self) -> float:
-        return sum(v.mm.pnl for v in self.venues.values()) / max(1,len(self.venues))
+        return self.state.symbol_pnl(self.i)
 
     def mid(self) -> float:
         mids = [v.lob.mid() for v in self.venues.values() if v.lob.mid() > 0]
         return sum(mids)/len(mids) if mids else 0.0
 
-    def make_quotes(self, alpha: float, ts: int):
-        chosen = self.selector.pick_venues(self.venues, k=self.top_k)
-        for name in chosen:
-            self.venues[name].mm.make_quote(alpha, ts)
+    def make_quotes(self, alpha: float, ts: int, t: float = 0.0):
+        self.send_quotes(self.quote_targets(alpha, t), ts)
+
+    def quote_targets(self, alpha: float, t: float = 0.0) -> Dict[str, tuple]:
+        return quote_targets_batch([self], [alpha], t)[0]
+
+    def quote_sizes(self, names: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        # Sizes for quoting `names` now: each side's room under the limit is split between
+        # them, after what the other venues' MMs are still working on that side.
+        cb = ca = 0
+        for n, v in self.venues.items():
+            if n not in names:
+                b, a = v.mm.working(); cb += b; ca += a
+        return {n: self.venues[n].mm.sizes(len(names), (cb, ca)) for n in names}
+
+    def venue_targets(self, name: str, alpha: float, t: float = 0.0) -> tuple:
+        # Requote of a single venue (e.g. after its fills), sized against the others.
+        return self.venues[name].mm.quote_targets(alpha, t, self.quote_sizes([name])[name])
+
+    def clip_targets(self, name: str, targets: tuple) -> tuple:
+        # Targets decided earlier, resized to the room left when they reach the venue.
+        bid, ask, sb, sa = targets
+        cb, ca = self.quote_sizes([name])[name]
+        return bid, ask, min(sb, cb), min(sa, ca)
+
+    def send_quotes(self, targets: Dict[str, tuple], ts: int):
+        for name, tg in targets.items():
+            self.venues[name].mm.send_quotes(tg, ts)
 
     def mark_to_market(self):
+        vs = list(self.venues.values())
+        self.state.mark([v.lob.mid() for v in vs], [[v.lob.volume["BUY"], v.lob.volume["SELL"]] for v in vs],
+                        idx=[v.mm.k for v in vs])
+
+    def quote_stats(self) -> Tuple[float, float, int, int]:
+        # (P(some bid starts filling within a step), same for asks, book ops, quotes kept),
+        # the probabilities combining the venues' fill_probability as independent, the counts
+        # summed over venues since the start.
+        nb = na = 1.0; ops = kept = 0
         for v in self.venues.values():
-            v.mm.mark_to_market()
+            pb, pa = v.mm.fill_probability()
+            nb *= 1.0 - pb; na *= 1.0 - pa
+            ops += v.mm.book_ops; kept += v.mm.quotes_kept
+        return 1.0 - nb, 1.0 - na, ops, kept
 
-    def hedge_portfolio(self, qty_perc: float):
+    def hedge_order(self, qty_perc: float) -> Optional[Tuple[Venue, str, int]]:
         inv = self.inventory()
-        if inv == 0: return
+        if inv == 0: return None
         hedge_qty = int(qty_perc * abs(inv))
-        if hedge_qty <= 0: return
-        best = sorted(self.venues.values(), key=lambda x: x.taker_fee_bps)[0]
-        side = "SELL" if inv > 0 else "BUY"
-        fills = best.lob.place_market(owner="MM", side=side, qty=hedge_qty)
-        best.mm.apply_taker_fills(fills, best.taker_fee_bps)
+        if hedge_qty <= 0: return None
+        return self._hedge_venue, "SELL" if inv > 0 else "BUY", hedge_qty
+
+    def execute_hedge(self, venue: Venue, side: str, qty: int):
+        fills = venue.lob.place_market(owner="MM", side=side, qty=qty)
+        venue.mm.apply_taker_fills(fills, venue.taker_fee_bps)
+
+    def hedge_portfolio(self, qty_perc: float):
+        order = self.hedge_order(qty_perc)
+        if order: self.execute_hedge(*order)
+
+    def _on_maker_fill(self, venue: str, side: str, qty: int, price: float, mid: float, capture: float, rebate: float):
+        # Maker fills enter the selector's markout queue from the venue mid at the fill, the
+        # same reference as their spread capture.
+        self.selector.on_fill(venue, side, qty, price, mid, capture, rebate)
+
+    def settle_markouts(self):
+        # Once per step, after marking: scores the fills whose markout horizon has passed
+        # against each venue's marked mid, or the symbol's mark where that venue is one-sided.
+        lm = self.state.last_mid; px = float(self.state.mark_px[self.i])
+        self.selector.settle({n: float(lm[v.mm.k]) if lm[v.mm.k] > 0.0 else px for n, v in self.venues.items()})
 
     def update_selector_from_exec(self, exec_event: dict):
+        # Scores an already marked-out exec record directly (offline replays of exec logs).
         if exec_event.get("role") == "maker":
             self.selector.update_from_fill(
                 venue=exec_event.get("venue","?"),
                 spread_capture=float(exec_event.get("spread_capture",0.0)),
                 notional=abs(exec_event.get("qty",0))*float(exec_event.get("price",0.0)),
                 maker_rebate=float(exec_event.get("fee",0.0)),
-                adverse=0.0
+                adverse=float(exec_event.get("adverse",0.0))
             )
+
+def quote_targets_batch(routers: Sequence[MarketMakerRouter], alphas: Sequence[float], t: float = 0.0) -> List[Dict[str, tuple]]:
+    # Quote targets for the routed venues of many routers, with every Avellaneda–Stoikov book
+    # priced in one optimal_quotes_batch call. t is the elapsed part of each MM's horizon as_T.
+    out: List[Dict[str, tuple]] = [{} for _ in routers]
+    books = []
+    for i, r in enumerate(routers):
+        names = r.selector.pick_venues(r.venues, k=r.top_k)
+        sizes = r.quote_sizes(names)
+        for name in names:
+            mm = r.venues[name].mm
+            if mm.use_avellaneda: books.append((i, name, mm, sizes[name]))
+            else: out[i][name] = mm.quote_targets(alphas[i], t, sizes[name])
+    if books:
+        cols = np.array([mm.quote_inputs(alphas[i], t) for i, _, mm, _ in books]).T
+        bid, ask, _, _ = optimal_quotes_batch(*cols)
+        for (i, name, mm, sz), b, a in zip(books, bid.tolist(), ask.tolist()):
+            out[i][name] = (b, a) + sz
+    return out
@@ -1,52 +1,33 @@
-import math
+import numpy as np
 
-def _safe(val, fallback):
-    try:
-        if val is None or math.isnan(val) or math.isinf(val):
-            return fallback
-    except Exception:
-        return fallback
-    return val
+def _clean(x, fallback, positive=True):
+    # NaN/inf -> fallback; with positive, abs() and zero -> fallback (as the scalar guards did).
+    x = np.asarray(x, dtype=float)
+    x = np.where(np.isfinite(x), x, fallback)
+    if positive:
+        x = np.abs(x); x = np.where(x > 0.0, x, fallback)
+    return x
 
-def _snap_bid(x, tick, mid):
-    tick = _safe(tick, 0.01)
-    if tick <= 0.0: tick = 0.01
-    x = _safe(x, mid - tick)
-    try:
-        return math.floor(x / tick) * tick
-    except Exception:
-        return round(mid - tick, 2)
+def optimal_quotes_batch(mid, q, sigma, gamma, k, T, tick, t=0.0):
+    # Avellaneda–Stoikov quotes for any number of books at once; every argument broadcasts.
+    # Reservation price r = mid - q*gamma*sigma^2*(T - t) and half spread
+    # gamma*sigma^2*(T - t)/2 + ln(1 + gamma/k)/gamma, at least one tick. Bids snap down and
+    # asks up to each book's tick. Returns (bid, ask, r, half) arrays.
+    mid = _clean(mid, 0.0, positive=False)
+    q = np.nan_to_num(np.asarray(q, dtype=float)).astype(np.int64)
+    sigma = _clean(sigma, 1e-6)
+    gamma = _clean(gamma, 1e-3)
+    k = _clean(k, 1e-3)
+    tick = _clean(tick, 0.01)
+    tau = np.maximum(_clean(T, 1.0, positive=False) - _clean(t, 0.0, positive=False), 1e-6)
 
-def _snap_ask(x, tick, mid):
-    tick = _safe(tick, 0.01)
-    if tick <= 0.0: tick = 0.01
-    x = _safe(x, mid + tick)
-    try:
-        return math.ceil(x / tick) * tick
-    except Exception:
-        return round(mid + tick, 2)
+    var_tau = gamma * sigma * sigma * tau
+    r = mid - q * var_tau
+    half = np.maximum(0.5 * var_tau + np.log1p(gamma / k) / gamma, tick)
+    bid = np.round(np.floor((r - half) / tick + 1e-9) * tick, 9)
+    ask = np.round(np.ceil((r + half) / tick - 1e-9) * tick, 9)
+    return bid, ask, r, half
 
-def optimal_quotes(mid: float, q: int, sigma: float, gamma: float, k: float, T: float, tick: float):
-    mid   = _safe(mid, 0.0)
-    q     = int(q or 0)
-    sigma = abs(_safe(sigma, 1e-6)) or 1e-6
-    gamma = abs(_safe(gamma, 1e-3)) or 1e-3
-    k     = abs(_safe(k, 1.5)) or 1e-3
-    T     = max(_safe(T, 1.0), 1e-6)
-    tick  = abs(_safe(tick, 0.01)) or 0.01
-
-    try:
-        r = mid - q * gamma * (sigma ** 2) * T
-    except Exception:
-        r = mid
-
-    try:
-        half = (1.0 / gamma) * math.log(1.0 + (gamma / k))
-    except Exception:
-        half = 0.01 * max(1.0, mid)
-
-    half = max(half, tick)
-    bid_raw, ask_raw = r - half, r + half
-    bid = _snap_bid(bid_raw, tick, mid)
-    ask = _snap_ask(ask_raw, tick, mid)
-    return round(bid,2), round(ask,2), r, half
+def optimal_quotes(mid: float, q: int, sigma: float, gamma: float, k: float, T: float, tick: float, t: float = 0.0):
+    bid, ask, r, half = optimal_quotes_batch(mid, q, sigma, gamma, k, T, tick, t)
+    return float(bid), float(ask), float(r), float(half)
@@ -15,4 +15,4 @@ def half_spread(sigma, gamma=0.1, k=1.5, T=1.0):
 def adjust_spread(prices, base_spread, gamma=0.1, k=1.5, T=1.0, window=50):
     sigma = realized_vol(prices, window=window)
     half_spd = half_spread(sigma, gamma=gamma, k=k, T=T)
-    return float(max(base_spread, 2 * half_spd))
\ No newline at end of file
+    return float(max(base_spread, 2 * half_spd))
@@ -1,9 +1,13 @@
 import pandas as pd
+from src.sim.store import EventStore
 
-def attribution_from_exec(exec_df: pd.DataFrame):
+def attribution_from_exec(exec_df, run_id: str = "latest", symbols=None):
+    if isinstance(exec_df, EventStore):
+        exec_df = exec_df.read("executions", columns=["symbol","venue","fee","spread_capture","qty"],
+                               symbols=symbols, run_ids=[run_id])
     if exec_df.empty:
         return pd.DataFrame(columns=["symbol","venue","maker_rebate","taker_fees","spread_capture","net_exec_pnl"])
-    g = exec_df.groupby(["symbol","venue"])
+    g = exec_df.groupby(["symbol","venue"], observed=True)
     out = g.agg(
         maker_rebate=("fee", lambda s: s[s>0].sum()),
         taker_fees=("fee", lambda s: -s[s<0].sum()),
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+@dataclass
+class VarBreakdown:
+    var: float
+    marginal: np.ndarray
+    component: np.ndarray
+
+class RollingCovariance:
+    # Covariance of per-symbol mid changes, updated in O(N^2) per observation.
+    # mode="window": running sums of x and x x^T over the last `window` rows (rebuilt from
+    # the ring every `refresh` updates to bound round-off). mode="ewma": RiskMetrics-style
+    # zero-mean EWMA with decay `lam`.
+    def __init__(self, n: int, window: int = 50, mode: str = "window", lam: float = 0.94,
+                 min_obs: int = 10, refresh: int = 1000):
+        if mode not in ("window", "ewma"):
+            raise ValueError(f"unknown covariance mode: {mode}")
+        self.n = n; self.window = window; self.mode = mode; self.lam = lam
+        self.min_obs = min_obs; self.refresh = refresh
+        self._ring = np.zeros((window, n)); self._pos = 0; self._count = 0; self._updates = 0
+        self._s = np.zeros(n); self._m = np.zeros((n, n))
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def update(self, x):
+        x = np.nan_to_num(np.asarray(x, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        self._updates += 1
+        if self.mode == "ewma":
+            self._m *= self.lam; self._m += (1.0 - self.lam) * np.outer(x, x)
+            self._count += 1
+            return
+        if self._count == self.window:
+            old = self._ring[self._pos]
+            self._s -= old; self._m -= np.outer(old, old)
+        else:
+            self._count += 1
+        self._ring[self._pos] = x; self._pos = (self._pos + 1) % self.window
+        self._s += x; self._m += np.outer(x, x)
+        if self._updates % self.refresh == 0:
+            r = self._ring[:self._count] if self._count < self.window else self._ring
+            self._s = r.sum(axis=0); self._m = r.T @ r
+
+    def cov(self) -> Optional[np.ndarray]:
+        if self._count < self.min_obs: return None
+        if self.mode == "ewma":
+            c = self._m.copy()
+        else:
+            k = self._count
+            c = (self._m - np.outer(self._s, self._s) / k) / (k - 1)
+        c = np.nan_to_num(c, nan=0.0, posinf=0.0, neginf=0.0)
+        return np.clip(c, -1e4, 1e4)
+
+    def var(self, positions, z: float = 1.65) -> VarBreakdown:
+        q = np.asarray(positions, dtype=float)
+        zero = VarBreakdown(0.0, np.zeros(self.n), np.zeros(self.n))
+        c = self.cov()
+        if c is None: return zero
+        cq = c @ q
+        var_price = float(q @ cq)
+        if not np.isfinite(var_price) or var_price <= 0.0: return zero
+        sigma = np.sqrt(var_price)
+        marginal = z * cq / sigma
+        return VarBreakdown(float(z * sigma), marginal, q * marginal)
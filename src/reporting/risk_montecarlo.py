@@ -1,22 +1,79 @@
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import pandas as pd
+from src.sim.store import EventStore
 
-def mc_from_df(df: pd.DataFrame, n_runs: int = 100, seed: int = 42):
-    rng = np.random.default_rng(seed)
+METHODS = ("iid", "block", "stationary")
+
+def _draw_indices(rng, m: int, T: int, method: str, block: int) -> np.ndarray:
+    if method == "iid":
+        return rng.integers(0, T, size=(m, T))
+    b = max(1, min(block, T))
+    if method == "block":
+        # circular moving-block bootstrap with fixed block length b
+        nb = -(-T // b)
+        starts = rng.integers(0, T, size=(m, nb))
+        return ((starts[:, :, None] + np.arange(b)) % T).reshape(m, nb * b)[:, :T]
+    # stationary bootstrap (Politis–Romano): geometric block lengths with mean b
+    t = np.arange(T)
+    new = rng.random((m, T)) < 1.0 / b; new[:, 0] = True
+    last = np.maximum.accumulate(np.where(new, t, 0), axis=1)
+    starts = rng.integers(0, T, size=(m, T))
+    return (np.take_along_axis(starts, last, axis=1) + (t - last)) % T
+
+def _chunk_stats(args):
+    rets, m, seed, method, block, noise_sd, conf = args
+    rng = np.random.default_rng(seed); T = len(rets)
+    r = rets[_draw_indices(rng, m, T, method, block)]
+    if noise_sd > 0: r += rng.normal(0, noise_sd, size=r.shape)
+    path = r.cumsum(axis=1)
+    peak = np.maximum(np.maximum.accumulate(path, axis=1), 0.0)
+    dd = peak - path
+    k = max(1, int(np.ceil((1 - conf) * T)))
+    es = np.partition(r, k - 1, axis=1)[:, :k].mean(axis=1)
+    return np.column_stack([path[:, -1], dd.max(axis=1), (dd > 0).mean(axis=1), es])
+
+def mc_bootstrap(rets, n_runs: int = 10000, seed: int = 42, method: str = "iid", block: int = 20,
+                 noise: float = 0.1, conf: float = 0.95, memory_mb: float = 256.0, workers: int = 1) -> np.ndarray:
+    # Returns an (n_runs, 4) array of per-path [terminal pnl, max drawdown, fraction of
+    # steps under water, ES of step pnl]. Paths are simulated in chunks whose working set
+    # (about four (m, T) float arrays) fits `memory_mb`; chunk seeds come from one
+    # SeedSequence, so results do not depend on `workers`.
+    if method not in METHODS:
+        raise ValueError(f"unknown bootstrap method: {method} (expected one of {METHODS})")
+    rets = np.asarray(rets, dtype=float); T = len(rets)
+    per_chunk = max(1, int(memory_mb * 2**20 // (4 * 8 * max(T, 1))))
+    sizes = [min(per_chunk, n_runs - a) for a in range(0, n_runs, per_chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    noise_sd = max(1e-9, float(np.std(rets))) * noise if noise > 0 else 0.0
+    jobs = [(rets, m, s, method, block, noise_sd, conf) for m, s in zip(sizes, seeds)]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            parts = list(ex.map(_chunk_stats, jobs))
+    else:
+        parts = [_chunk_stats(j) for j in jobs]
+    return np.vstack(parts)
+
+def _dist(x: np.ndarray) -> dict:
+    return {"mean": float(x.mean()), "p5": float(np.quantile(x, 0.05)),
+            "p50": float(np.quantile(x, 0.50)), "p95": float(np.quantile(x, 0.95))}
+
+def mc_from_df(df, n_runs: int = 100, seed: int = 42, run_id: str = "latest", symbols=None,
+               method: str = "iid", block: int = 20, memory_mb: float = 256.0, workers: int = 1):
+    if isinstance(df, EventStore):
+        df = df.read("events", columns=["timestamp","pnl","inventory"], symbols=symbols, run_ids=[run_id])
     pf = df.groupby("timestamp")[["pnl","inventory"]].sum().reset_index()
     if len(pf) < 2:
         return {"mean_pnl":0.0,"p5":0.0,"p50":0.0,"p95":0.0}
     rets = pf["pnl"].diff().fillna(0.0).values
-    results = []
-    for _ in range(n_runs):
-        idx = rng.integers(0, len(rets), size=len(rets))
-        r = rets[idx] + rng.normal(0, max(1e-9, np.std(rets))*0.1, size=len(rets))
-        pnl_path = r.cumsum()
-        results.append(pnl_path[-1])
-    arr = np.array(results)
+    st = mc_bootstrap(rets, n_runs=n_runs, seed=seed, method=method, block=block, memory_mb=memory_mb, workers=workers)
+    arr = st[:, 0]
     return {
         "mean_pnl": float(arr.mean()),
         "p5": float(np.quantile(arr, 0.05)),
         "p50": float(np.quantile(arr, 0.50)),
         "p95": float(np.quantile(arr, 0.95)),
+        "n_runs": int(n_runs), "method": method,
+        "max_drawdown": _dist(st[:, 1]),
+        "time_under_water": _dist(st[:, 2]),
+        "es": _dist(st[:, 3]),
     }
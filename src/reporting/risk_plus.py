@@ -1,3 +1,5 @@
+import bisect
+from collections import deque
 import numpy as np
 import pandas as pd
 
@@ -8,12 +10,51 @@ def expected_shortfall(returns: np.ndarray, conf: float = 0.95):
     if tail.size == 0: return 0.0
     return float(tail.mean())
 
-def rolling_es(pnl_series: pd.Series, window: int = 100, conf: float = 0.95):
-    if len(pnl_series) < window + 1:
-        return pd.Series([0.0]*len(pnl_series))
-    rets = pnl_series.diff().fillna(0.0).values
-    es_vals = []
-    for i in range(len(rets)):
-        if i < window: es_vals.append(0.0)
-        else: es_vals.append(expected_shortfall(np.array(rets[i-window:i]), conf=conf))
-    return pd.Series(es_vals)
+def rolling_es(pnl_series: pd.Series, window: int = 100, conf: float = 0.95, chunk: int = 4096):
+    # es[i] = expected_shortfall(rets[i-window:i]); windows are evaluated in chunks of sorted rows.
+    n = len(pnl_series)
+    if n < window + 1:
+        return pd.Series([0.0]*n)
+    rets = pnl_series.diff().fillna(0.0).values.astype(float)
+    out = np.zeros(n)
+    wins = np.lib.stride_tricks.sliding_window_view(rets[:-1], window)
+    for a in range(0, len(wins), chunk):
+        w = np.sort(wins[a:a+chunk], axis=1)
+        q = np.quantile(w, 1-conf, axis=1)
+        mask = w <= q[:, None]
+        cnt = mask.sum(axis=1)
+        out[window+a:window+a+len(w)] = np.where(cnt > 0, (w*mask).sum(axis=1) / np.maximum(cnt, 1), 0.0)
+    return pd.Series(out)
+
+class RollingES:
+    # Streaming ES over the last `window` observations: a sorted copy of the window is
+    # maintained with bisect (O(log window) search per update), and the tail mean only
+    # touches the (1-conf)*window smallest values.
+    def __init__(self, window: int = 100, conf: float = 0.95):
+        self.window = window; self.conf = conf
+        self._ring = deque()
+        self._sorted = []
+
+    def __len__(self):
+        return len(self._ring)
+
+    @property
+    def ready(self) -> bool:
+        return len(self._ring) >= self.window
+
+    def update(self, x: float):
+        x = float(x)
+        if len(self._ring) == self.window:
+            old = self._ring.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._ring.append(x)
+        bisect.insort(self._sorted, x)
+
+    def value(self) -> float:
+        s = self._sorted; n = len(s)
+        if n == 0: return 0.0
+        pos = (n - 1) * (1 - self.conf)
+        lo = int(pos); hi = min(lo + 1, n - 1)
+        q = s[lo] + (s[hi] - s[lo]) * (pos - lo)
+        m = bisect.bisect_right(s, q)
+        return sum(s[:m]) / m if m else 0.0
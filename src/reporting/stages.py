@@ -0,0 +1,71 @@
+import os, json
+from typing import Dict, Iterable
+from src.utils.config import Config
+from src.sim.engine import SimResult
+from src.reporting.performance_stats import basic_stats
+from src.reporting.html_report import save_html_report
+from src.reporting.pnl_attribution import attribution_from_exec
+from src.reporting.risk_montecarlo import mc_from_df
+
+# Optional post-run stages. Tearsheet (PIL) and PDF (reportlab) imports happen only
+# when those stages run, so headless runs never load them.
+ALL_STAGES = ("attribution", "tearsheets", "mc", "pdf")
+
+def attribution_stage(result: SimResult, cfg: Config, out: dict):
+    attrib = attribution_from_exec(result.executions)
+    path = os.path.join(cfg.report_path, "pnl_attribution_v11.csv")
+    os.makedirs(cfg.report_path, exist_ok=True); attrib.to_csv(path, index=False)
+    out["attribution"] = path
+
+def tearsheet_stage(result: SimResult, cfg: Config, out: dict):
+    from src.reporting.tearsheet import save_tearsheet
+    df = result.events
+    html_paths, image_paths = [], []
+    for s in cfg.symbols:
+        sub = df[df["symbol"]==s].reset_index(drop=True)
+        stats = basic_stats(sub)
+        print(f"==== BASIC STATS [{s}] ===="); print(stats.to_string())
+        image_paths.append(save_tearsheet(sub, os.path.join(cfg.report_path, s)))
+        html_paths.append(save_html_report(sub, stats, os.path.join(cfg.report_path, s), "report.html"))
+    pf = portfolio_frame(df)
+    pf_stats = basic_stats(pf.rename(columns={"var_pf":"pnl"}))
+    image_paths.append(save_tearsheet(pf, os.path.join(cfg.report_path, "PORTFOLIO")))
+    html_paths.append(save_html_report(pf, pf_stats, os.path.join(cfg.report_path, "PORTFOLIO"), "report.html"))
+    out["html"] = html_paths; out["images"] = image_paths
+
+def mc_stage(result: SimResult, cfg: Config, out: dict):
+    mc = mc_from_df(result.events, n_runs=cfg.mc_runs, seed=123, method=cfg.mc_method, block=cfg.mc_block,
+                    memory_mb=cfg.mc_memory_mb, workers=cfg.mc_workers)
+    os.makedirs(cfg.report_path, exist_ok=True)
+    with open(os.path.join(cfg.report_path, "MC_SUMMARY_v11.json"), "w") as f:
+        json.dump(mc, f, indent=2)
+    out["mc"] = mc
+
+def pdf_stage(result: SimResult, cfg: Config, out: dict):
+    from src.reporting.pdf_report import build_pdf
+    pf = portfolio_frame(result.events)
+    pdf_path = os.path.join(cfg.report_path, "RISK_REPORT_v11.pdf")
+    summary = {
+        "Symbols": ", ".join(cfg.symbols),
+        "Final Portfolio PnL": float(pf["pnl"].iloc[-1]) if len(pf) else 0.0,
+        "Final Portfolio Inventory": float(pf["inventory"].iloc[-1]) if len(pf) else 0.0,
+        "Last Portfolio VaR": float(pf["var_pf"].iloc[-1]) if len(pf) else 0.0,
+        "Last Portfolio ES": float(pf["es"].iloc[-1]) if len(pf) else 0.0,
+        "MC": out.get("mc", {})
+    }
+    build_pdf(pdf_path, "MM_SENTIMENT v11 — Risk Report", summary, out.get("images", []))
+    print("PDF report saved:", pdf_path)
+    out["pdf"] = pdf_path
+
+STAGES = {"attribution": attribution_stage, "tearsheets": tearsheet_stage, "mc": mc_stage, "pdf": pdf_stage}
+
+def portfolio_frame(df):
+    return df.groupby("timestamp")[["pnl","inventory","var_pf","es"]].sum().reset_index()
+
+def run_stages(result: SimResult, cfg: Config, stages: Iterable[str] = ALL_STAGES) -> Dict[str, object]:
+    out: Dict[str, object] = {}
+    for name in stages:
+        if name not in STAGES:
+            raise ValueError(f"unknown report stage: {name}")
+        STAGES[name](result, cfg, out)
+    return out
@@ -0,0 +1,233 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from src.utils.config import Config
+from src.alpha.news_stream import make_feed
+from src.alpha.sentiment_signal import KeywordMatcher, SentimentBook, load_lexicon
+from src.execution.depth_lob import DepthLOB
+from src.execution.venue_router import MarketMakerRouter, quote_targets_batch
+from src.execution.smart_router import SmartVenueSelector
+from src.execution.portfolio_state import PortfolioState
+from src.execution.flow_sim import ExternalFlow
+from src.execution.flow_hawkes import Hawkes1D, MultiHawkes
+from src.reporting.risk_plus import RollingES
+from src.reporting.portfolio_risk import RollingCovariance, VarBreakdown
+from src.sim.regime import Regime2State
+from src.sim.recorder import ColumnarRecorder, EVENT_SCHEMA, EXEC_SCHEMA
+from src.utils.rng import RngRegistry
+
+@dataclass
+class SimResult:
+    events: pd.DataFrame
+    executions: pd.DataFrame
+
+def compute_portfolio_var(state: PortfolioState, risk: RollingCovariance, z: float = 1.65) -> VarBreakdown:
+    # Net inventory and last mark change of each symbol, from the position ledger.
+    risk.update(state.mark_px - state.prev_mark_px)
+    return risk.var(state.pos.astype(float), z=z)
+
+class Simulation:
+    # The quote -> flow -> mark -> portfolio-VaR -> hedge loop, with results kept in memory.
+    # No files, reports or plotting libraries are touched here; pass a logger to get progress lines.
+    def __init__(self, cfg: Config, log: Optional[logging.Logger] = None):
+        self.cfg = cfg; self.log = log
+        self.symbols: List[str] = list(cfg.symbols)
+        self.rngs = RngRegistry(cfg.seed)
+        self.t = 0
+        rec_kw = dict(chunk=cfg.recorder_chunk, spill_dir=cfg.recorder_spill_dir)
+        self.records = ColumnarRecorder(EVENT_SCHEMA, **rec_kw)
+        self.exec_events = ColumnarRecorder(EXEC_SCHEMA, **rec_kw)
+        self._flushed = (0, 0)
+        self._init_drivers()
+        self._init_books()
+
+    def _init_drivers(self):
+        # Inputs shared by every symbol: news and sentiment, regime, market-order arrivals and
+        # the portfolio covariance.
+        cfg = self.cfg
+        self.sentiment = SentimentBook(self.symbols, smooth=cfg.alpha_smooth,
+                                       matcher=KeywordMatcher(load_lexicon(cfg.sentiment_lexicon, cfg.sentiment_lexicon_path)))
+        self.news = self._make_news()
+        self.mhawkes = None
+        if cfg.use_hawkes and cfg.hawkes_mode == "multi":
+            self.mhawkes = MultiHawkes.for_grid(len(self.symbols), len(cfg.venues), cfg.hawkes_side_mu, cfg.hawkes_decay,
+                                                cfg.hawkes_self, cfg.hawkes_cross_side, cfg.hawkes_cross_venue,
+                                                cfg.hawkes_cross_symbol, rng=self.rngs.get("hawkes"))
+        self.regime = Regime2State(rng=self.rngs.get("regime"))
+        self.pf_risk = RollingCovariance(len(self.symbols), window=cfg.var_window, mode=cfg.var_mode, lam=cfg.var_ewma_lambda)
+
+    def _init_books(self):
+        # Per-symbol state: books, market makers, their flow generators and ES estimators.
+        cfg = self.cfg
+        mm_kwargs = dict(
+            alpha_weight=cfg.alpha_weight, alpha_smooth=cfg.alpha_smooth,
+            max_move=cfg.max_move, base_spread_bps=cfg.base_spread_bps, tick_size=cfg.tick_size,
+            tx_fee_bps=cfg.tx_fee_bps, skew_k=cfg.skew_k,
+            use_avellaneda=cfg.use_avellaneda, as_gamma=cfg.as_gamma, as_k=cfg.as_k, as_T=cfg.as_T,
+            adaptive_tick=cfg.adaptive_tick, min_tick=cfg.min_tick, max_tick=cfg.max_tick,
+            vol_low=cfg.vol_low, vol_high=cfg.vol_high,
+            vol_window=cfg.vol_window, history_len=cfg.history_len, keep_full_history=cfg.keep_full_history,
+            keep_queue=cfg.keep_queue, keep_min_frac=cfg.keep_min_frac, flow_ewma=cfg.flow_ewma
+        )
+        self.state = PortfolioState(self.symbols, [v.name for v in cfg.venues], vol_window=cfg.vol_window,
+                                    history_len=cfg.history_len, keep_full_history=cfg.keep_full_history,
+                                    flow_ewma=cfg.flow_ewma)
+        self.routers: Dict[str, MarketMakerRouter] = {
+            s: MarketMakerRouter(s, cfg.venues, cfg.start_price, cfg.tick_size,
+                                 cfg.quote_size, cfg.inventory_limit, mm_kwargs, self.exec_events,
+                                 top_k=cfg.router_top_k, books=self._make_books(s), state=self.state,
+                                 selector=SmartVenueSelector(cfg.selector_lookback, mode=cfg.selector_mode,
+                                                             markout_steps=cfg.markout_steps, ucb_c=cfg.selector_ucb_c,
+                                                             rng=self.rngs.get("selector", s)))
+            for s in self.symbols}
+        self._lobs = [v.lob for s in self.symbols for v in self.routers[s].venues.values()]
+        self.hawkes = {s: Hawkes1D(cfg.hawkes_mu, cfg.hawkes_alpha, cfg.hawkes_beta, rng=self.rngs.get("hawkes", s))
+                       for s in self.symbols}
+        self.flows = {(s, v): ExternalFlow(rng=self.rngs.get("flow", s, v)) for s in self.symbols for v in self.routers[s].venues}
+        self.es_est = {s: RollingES(cfg.es_window, cfg.es_conf) for s in self.symbols}
+        for s in self.symbols: self.es_est[s].update(0.0)
+
+    def _make_news(self):
+        return make_feed(self.cfg, self.symbols, self.rngs)
+
+    def _make_books(self, symbol: str) -> Optional[Dict[str, DepthLOB]]:
+        return None   # synthetic ladders built by MarketMakerRouter
+
+    @property
+    def done(self) -> bool:
+        return False
+
+    def _info(self, msg: str):
+        if self.log: self.log.info(msg)
+
+    def _hawkes_scale(self, flow_mult: float) -> np.ndarray:
+        # Per-dimension baseline multiplier: the regime scales it and the signal tilts it
+        # towards buys exactly as p_buy does in ExternalFlow.apply.
+        p_buy = np.array([0.5 + 0.4 * max(self.sentiment[s], 0.0) for s in self.symbols])
+        tilt = np.stack([2.0 * p_buy, 2.0 * (1.0 - p_buy)], axis=1)[:, None, :]
+        return np.broadcast_to(flow_mult * tilt, (len(self.symbols), len(self.cfg.venues), 2)).ravel()
+
+    def _hawkes_counts(self, flow_mult: float) -> np.ndarray:
+        # Market-order counts for every (symbol, venue, side) this step.
+        scale = self._hawkes_scale(flow_mult)
+        h = self.mhawkes
+        n = h.step_exact(1.0, mu_scale=scale) if self.cfg.hawkes_exact else h.step(1.0, mu_scale=scale)
+        return n.reshape(len(self.symbols), len(self.cfg.venues), 2)
+
+    def _as_elapsed(self) -> float:
+        # Elapsed part of the Avellaneda–Stoikov horizon: the run spans as_T when as_finite_horizon.
+        cfg = self.cfg
+        return cfg.as_T * min(self.t / max(1, cfg.n_steps), 1.0) if cfg.as_finite_horizon else 0.0
+
+    def _quote_targets(self) -> List[Dict[str, tuple]]:
+        return quote_targets_batch([self.routers[s] for s in self.symbols],
+                                   [self.sentiment[s] for s in self.symbols], self._as_elapsed())
+
+    def _on_news(self, t: int) -> bool:
+        due = self.news.poll(t)
+        if not due: return False
+        syms, heads = zip(*due)
+        self.sentiment.on_batch(syms, heads)
+        for s, h in zip(syms, heads):
+            self._info(f"[{s}] News: '{h}' alpha_smooth={self.sentiment[s]:.3f}")
+        return True
+
+    def step(self):
+        st, counts = self._draw()
+        self._advance(st, counts)
+        self._end_step(st)
+
+    def _draw(self):
+        # This step's shared inputs: news into the alphas, the regime and, with the
+        # multivariate Hawkes, market-order counts for every (symbol, venue, side).
+        self._on_news(self.t)
+        st = self.regime.step()
+        counts = self._hawkes_counts(2.0 if st==Regime2State.STRESS else 1.0) if self.mhawkes is not None else None
+        return st, counts
+
+    def _advance(self, st: int, counts: Optional[np.ndarray]):
+        # Quote, run the external flow on every book and mark; symbols do not interact here.
+        cfg, t, routers = self.cfg, self.t, self.routers
+        flow_mult = 2.0 if st==Regime2State.STRESS else 1.0
+        targets = self._quote_targets()
+        for i, s in enumerate(self.symbols):
+            alpha = self.sentiment[s]
+            routers[s].send_quotes(targets[i], ts=t)
+            for j, v in enumerate(routers[s].venues.values()):
+                flow = self.flows[(s, v.name)]
+                if counts is not None:
+                    n_lim = int(flow.rng.poisson(cfg.hawkes_limit_rate * flow_mult))
+                    flow.apply_counts(v.lob, counts[i, j, 0], counts[i, j, 1], n_lim,
+                                      impact_kappa=cfg.impact_kappa, tick=cfg.tick_size, on_fills=v.mm.on_fills)
+                    continue
+                n = 1
+                if cfg.use_hawkes:
+                    _ = self.hawkes[s].step_intensity(0); n = 1 + self.hawkes[s].sample_events()
+                flow.apply(v.lob, alpha, n_calls=int(flow_mult*n), intensity=1.0,
+                           impact_kappa=cfg.impact_kappa, tick=cfg.tick_size, on_fills=v.mm.on_fills)
+        self._mark_all()
+
+    def _mark_all(self):
+        # One array mark of every book, in state order (symbol-major, venues as configured).
+        lobs = self._lobs
+        self.state.mark([lob.mid() for lob in lobs], [(lob.volume["BUY"], lob.volume["SELL"]) for lob in lobs])
+
+    def _send_hedge(self, router: MarketMakerRouter, qty_perc: float):
+        router.hedge_portfolio(qty_perc)
+
+    def _end_step(self, st: int):
+        # Portfolio VaR, hedging and one event row per symbol, after every book is marked.
+        var_bd = compute_portfolio_var(self.state, self.pf_risk, z=self.cfg.var_z)
+        self._finish_step(st, var_bd.var, var_bd.component, self._breach(var_bd.var))
+
+    def _breach(self, var_pf: float) -> bool:
+        cfg = self.cfg
+        if np.isfinite(var_pf) and var_pf > cfg.portfolio_var_limit and cfg.hedge_portfolio_on_breach:
+            self._info(f"[PF] HEDGE portfolio: VaR {var_pf:.2f} > {cfg.portfolio_var_limit:.2f}")
+            return True
+        return False
+
+    def _finish_step(self, st: int, var_pf: float, component: np.ndarray, hedged: bool):
+        cfg, t, routers = self.cfg, self.t, self.routers
+        if hedged:
+            for s in self.symbols:
+                self._send_hedge(routers[s], cfg.hedge_fraction_portfolio)
+        event = "HEDGE_PF" if hedged else ""
+        log_rows = self.log and t % 50 == 0
+        dmid = (self.state.mark_px - self.state.prev_mark_px).tolist()
+        for i, s in enumerate(self.symbols):
+            routers[s].settle_markouts()
+            mid = routers[s].mid(); inv = routers[s].inventory(); pnl = routers[s].pnl()
+            es = self.es_est[s]
+            es_val = es.value() if es.ready else 0.0
+            es.update(dmid[i])
+            self.records.append_row((s, t, mid, inv, pnl, self.sentiment[s], var_pf,
+                                     float(component[i]), es_val, st, event) + routers[s].quote_stats())
+            if log_rows:
+                self.log.info(f"[{s}] Iter {t:4d}: mid={mid:.2f} inv={inv} pnl={pnl:.2f}")
+        self.t += 1
+
+    def run(self, n: Optional[int] = None, sink=None, flush_every: Optional[int] = None) -> SimResult:
+        # With a sink, rows recorded since the last flush are appended to it every
+        # `flush_every` steps and once more at the end, after which the sink is closed.
+        for _ in range(self.cfg.n_steps if n is None else n):
+            if self.done: break
+            self.step()
+            if sink is not None and flush_every and self.t % flush_every == 0:
+                self.flush(sink)
+        if sink is not None:
+            self.flush(sink); sink.close()
+        return self.result()
+
+    def close(self):
+        self.news.close()
+
+    def flush(self, sink):
+        ev0, ex0 = self._flushed
+        sink.append(self.records.to_pandas(ev0), self.exec_events.to_pandas(ex0))
+        self._flushed = (len(self.records), len(self.exec_events))
+
+    def result(self) -> SimResult:
+        return SimResult(self.records.to_pandas(), self.exec_events.to_pandas())
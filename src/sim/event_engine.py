@@ -0,0 +1,162 @@
+import heapq, itertools, logging, math
+from typing import Optional
+import numpy as np
+from src.utils.config import Config
+from src.execution.flow_hawkes import MultiHawkes
+from src.sim.engine import Simulation, compute_portfolio_var
+from src.execution.venue_router import quote_targets_batch
+from src.sim.regime import Regime2State
+
+MKT, LIM, QUOTE, NOTICE, HEDGE = range(5)
+
+class EventQueue:
+    # Min-heap of (time, seq, kind, payload); seq keeps same-time events in FIFO order.
+    def __init__(self):
+        self._heap = []; self._seq = itertools.count()
+
+    def push(self, t: float, kind: int, payload=None):
+        heapq.heappush(self._heap, (t, next(self._seq), kind, payload))
+
+    def pop(self):
+        t, _, kind, payload = heapq.heappop(self._heap)
+        return t, kind, payload
+
+    def peek_time(self) -> float:
+        return self._heap[0][0] if self._heap else math.inf
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+class EventSimulation(Simulation):
+    # Continuous-time variant of Simulation: one step() covers bar_ms of venue time. Market
+    # orders arrive at the multivariate Hawkes event times and limit orders at Poisson times.
+    # Quotes, cancels and hedges reach a book latency_ms after they are decided. Fills reach
+    # the quoting MM latency_ms after they happen, and it then requotes. The clock jumps from
+    # one event to the next, so cost follows the number of events, not the time resolution:
+    # a bar requotes only symbols whose mids or alpha moved (or that hedged) since their last
+    # quote, and a bar with no events and no news does no marking, VaR or recording. Rows are
+    # written for active bars only, plus every event_sample_every bars if that is set.
+    def __init__(self, cfg: Config, log: Optional[logging.Logger] = None):
+        super().__init__(cfg, log)
+        self.now = 0.0
+        self.queue = EventQueue()
+        self.n_events = 0
+        if self.mhawkes is None:   # arrival times are still needed: fall back to plain Poisson flow
+            self.mhawkes = MultiHawkes.for_grid(len(self.symbols), len(cfg.venues), cfg.hawkes_side_mu,
+                                                cfg.hawkes_decay, 0.0, rng=self.rngs.get("hawkes"))
+        # Index k here is dimension 2k (buy) / 2k+1 (sell) of the Hawkes grid.
+        self.venue_list = [(s, v) for s in self.symbols for v in self.routers[s].venues.values()]
+        self._fill_cb = {(s, v.name): self._fill_handler(s, v) for s, v in self.venue_list}
+        self._pending = set()
+        self._quoted_mid = np.full(len(self._lobs), np.nan)   # mids at each book's last quote decision
+        self._quoted_alpha = np.full(len(self.symbols), np.nan)
+        self._requote = set()                                 # symbols that hedged since
+        self._last_var = (0.0, np.zeros(len(self.symbols)))
+
+    def _fill_handler(self, s, v):
+        def on_fills(fills):
+            v.mm.on_fills(fills)
+            key = (s, v.name)
+            if key not in self._pending and any(f.owner == "MM" for f in fills):
+                self._pending.add(key)
+                self.queue.push(self.now + v.latency_ms, NOTICE, (s, v))
+        return on_fills
+
+    def _schedule_flow(self, t0: float, flow_mult: float):
+        cfg, bar, q = self.cfg, self.cfg.bar_ms, self.queue
+        h = self.mhawkes; start = h.t
+        times, dims = h.simulate(1.0, mu_scale=self._hawkes_scale(flow_mult))
+        for tm, d in zip((t0 + (times - start) * bar).tolist(), dims.tolist()):
+            s, v = self.venue_list[d >> 1]
+            q.push(tm, MKT, (s, v, d & 1 == 0))
+        for s, v in self.venue_list:
+            rng = self.flows[(s, v.name)].rng
+            for tm in (t0 + rng.random(rng.poisson(cfg.hawkes_limit_rate * flow_mult)) * bar).tolist():
+                q.push(tm, LIM, (s, v))
+
+    def _dispatch(self, kind: int, p):
+        cfg = self.cfg
+        if kind == MKT:
+            s, v, buy = p
+            self.flows[(s, v.name)].apply_counts(v.lob, int(buy), int(not buy), 0, impact_kappa=cfg.impact_kappa,
+                                                 tick=cfg.tick_size, on_fills=self._fill_cb[(s, v.name)])
+        elif kind == LIM:
+            s, v = p
+            self.flows[(s, v.name)].apply_counts(v.lob, 0, 0, 1, impact_kappa=cfg.impact_kappa, tick=cfg.tick_size)
+        elif kind == QUOTE:
+            s, v, targets, ts = p
+            v.mm.send_quotes(self.routers[s].clip_targets(v.name, targets), ts)
+        elif kind == NOTICE:
+            s, v = p
+            self._pending.discard((s, v.name))
+            self.queue.push(self.now + v.latency_ms, QUOTE, (s, v, self.routers[s].venue_targets(v.name, self.sentiment[s], self._as_elapsed()), self.t))
+        elif kind == HEDGE:
+            router, venue, side, qty = p
+            router.execute_hedge(venue, side, qty)
+            self._requote.add(router.symbol)
+
+    def _send_hedge(self, router, qty_perc: float):
+        order = router.hedge_order(qty_perc)
+        if order: self.queue.push(self.now + order[0].latency_ms, HEDGE, (router, *order))
+
+    def _stale(self) -> np.ndarray:
+        # Symbols whose quotes were decided on other mids or alpha than now (all of them with a
+        # finite A-S horizon, where quotes also move with time).
+        S = len(self.symbols)
+        if self.cfg.as_finite_horizon: return np.arange(S)
+        mids = np.fromiter((lob.mid() for lob in self._lobs), dtype=float, count=len(self._lobs))
+        moved = (mids != self._quoted_mid).reshape(S, -1).any(axis=1) | (self.sentiment.alpha != self._quoted_alpha)
+        for s in self._requote: moved[self.state.symbol_index[s]] = True
+        self._requote.clear()
+        idx = np.flatnonzero(moved)
+        books = self.state.by_symbol(np.arange(len(mids)))[idx].ravel()
+        self._quoted_mid[books] = mids[books]; self._quoted_alpha[idx] = self.sentiment.alpha[idx]
+        return idx
+
+    def step(self):
+        t, routers, q = self.t, self.routers, self.queue
+        t0 = self.now; t1 = t0 + self.cfg.bar_ms
+        news = self._on_news(t)
+        st = self.regime.step()
+        self._schedule_flow(t0, 2.0 if st==Regime2State.STRESS else 1.0)
+        syms = [self.symbols[i] for i in self._stale().tolist()]
+        if syms:
+            targets = quote_targets_batch([routers[s] for s in syms], [self.sentiment[s] for s in syms], self._as_elapsed())
+            for s, tg_s in zip(syms, targets):
+                for name, tg in tg_s.items():
+                    v = routers[s].venues[name]
+                    q.push(t0 + v.latency_ms, QUOTE, (s, v, tg, t))
+        n0 = self.n_events
+        while q.peek_time() < t1:
+            self.now, kind, payload = q.pop()
+            self._dispatch(kind, payload); self.n_events += 1
+        self.now = t1
+        if self.n_events > n0 or news:
+            self._mark_all()
+            var_bd = compute_portfolio_var(self.state, self.pf_risk, z=self.cfg.var_z)
+            self._last_var = (var_bd.var, var_bd.component)
+            self._finish_step(st, var_bd.var, var_bd.component, self._breach(var_bd.var))
+            return
+        # idle bar: nothing moved, so there is nothing to mark, price or hedge
+        every = self.cfg.event_sample_every
+        if every and t % every == 0: self._sample_rows(st)
+        self.t += 1
+
+    def _sample_rows(self, st: int):
+        # Rows for an idle bar from the current state and the last VaR, updating no estimator.
+        var_pf, comp = self._last_var
+        for i, s in enumerate(self.symbols):
+            r, es = self.routers[s], self.es_est[s]
+            self.records.append_row((s, self.t, r.mid(), r.inventory(), r.pnl(), self.sentiment[s], var_pf,
+                                     float(comp[i]), es.value() if es.ready else 0.0, st, "") + r.quote_stats())
+
+def make_simulation(cfg: Config, log: Optional[logging.Logger] = None) -> Simulation:
+    if cfg.shards > 1:
+        from src.sim.sharded import ShardedSimulation
+        return ShardedSimulation(cfg, log=log)
+    if cfg.engine == "event": return EventSimulation(cfg, log=log)
+    if cfg.engine == "step": return Simulation(cfg, log=log)
+    if cfg.engine == "replay":
+        from src.sim.replay import ReplaySimulation
+        return ReplaySimulation(cfg, log=log)
+    raise ValueError(f"Unknown engine: {cfg.engine!r} (expected 'step', 'event' or 'replay')")
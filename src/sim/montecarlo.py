@@ -0,0 +1,123 @@
+import os, json, argparse, dataclasses
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from src.utils.config import Config, load_config
+from src.utils.logger import get_logger
+from src.sim.event_engine import make_simulation
+
+# Full-simulation Monte Carlo: N independent runs of the market-making loop, each with its
+# own seed, hence its own RNG streams for flow, Hawkes, regime and news timing, aggregated as they complete.
+
+MC_NEWS_JITTER = 10   # default +/- steps of synthetic news timing per run when the config has none
+METRICS = ("pnl_end", "max_drawdown", "inv_end", "es_last", "var_max", "n_hedges")
+
+@dataclass
+class FullMcResult:
+    runs: pd.DataFrame
+    summary: Dict[str, dict]
+    converged: bool
+
+def run_summary(cfg: Config, seed: int) -> dict:
+    cfg = dataclasses.replace(cfg, seed=int(seed))
+    sim = make_simulation(cfg)
+    try:
+        ev = sim.run(cfg.n_steps).events
+    finally:
+        sim.close()
+    pf = ev.groupby("timestamp").agg(pnl=("pnl", "sum"), inventory=("inventory", "sum"), es=("es", "sum"),
+                                     var_pf=("var_pf", "first"), event=("event", "first"))
+    pnl = pf["pnl"].values
+    dd = np.maximum.accumulate(np.maximum(pnl, 0.0)) - pnl
+    return {"seed": int(seed), "pnl_end": float(pnl[-1]), "max_drawdown": float(dd.max()),
+            "inv_end": float(pf["inventory"].iloc[-1]), "es_last": float(pf["es"].iloc[-1]),
+            "var_max": float(pf["var_pf"].max()), "n_hedges": int((pf["event"] == "HEDGE_PF").sum())}
+
+def quantile_ci(x: np.ndarray, q: float, n_boot: int = 200, level: float = 0.95, rng=None):
+    rng = rng if rng is not None else np.random.default_rng(0)
+    bs = np.quantile(x[rng.integers(0, len(x), size=(n_boot, len(x)))], q, axis=1)
+    a = (1 - level) / 2
+    return float(np.quantile(x, q)), float(np.quantile(bs, a)), float(np.quantile(bs, 1 - a))
+
+def summarize(runs: pd.DataFrame, quantiles: Sequence[float] = (0.05, 0.5, 0.95), n_boot: int = 200) -> Dict[str, dict]:
+    out = {}
+    for m in METRICS:
+        x = runs[m].values.astype(float); n = len(x)
+        se = float(x.std(ddof=1) / np.sqrt(n)) if n > 1 else float("nan")
+        d = {"mean": float(x.mean()), "mean_ci": [float(x.mean() - 1.96*se), float(x.mean() + 1.96*se)]}
+        for q in quantiles:
+            v, lo, hi = quantile_ci(x, q, n_boot=n_boot)
+            d[f"q{int(round(q*100)):02d}"] = v; d[f"q{int(round(q*100)):02d}_ci"] = [lo, hi]
+        out[m] = d
+    return out
+
+def _converged(runs: pd.DataFrame, metric: str, quantiles, rel_tol: float, n_boot: int) -> bool:
+    x = runs[metric].values.astype(float)
+    scale = max(float(np.std(x)), 1e-9)
+    for q in quantiles:
+        v, lo, hi = quantile_ci(x, q, n_boot=n_boot)
+        if (hi - lo) / 2 > rel_tol * max(abs(v), scale): return False
+    return True
+
+def run_full_mc(cfg: Config, n_runs: int = 64, workers: Optional[int] = None, seed: Optional[int] = None,
+                metric: str = "pnl_end", quantiles: Sequence[float] = (0.05, 0.5, 0.95),
+                rel_tol: float = 0.05, min_runs: int = 16, check_every: int = 8, n_boot: int = 200,
+                on_update: Optional[Callable[[pd.DataFrame], None]] = None,
+                news_jitter: Optional[int] = None) -> FullMcResult:
+    # news_jitter (default: cfg.news_jitter, or MC_NEWS_JITTER when that is 0) shifts the
+    # synthetic news of each run by its own seed, so runs don't all share the tape's timing.
+    # Keeps at most 2*workers runs in flight. Runs are taken in seed order: once the first
+    # m >= `min_runs` have all finished, for every m that is a multiple of `check_every` the
+    # bootstrap CI of each `metric` quantile over those m runs is compared with
+    # rel_tol * max(|quantile|, std), and the first m runs are the result once all are inside.
+    # The outcome therefore depends on the seed, not on which worker finishes first.
+    workers = workers or os.cpu_count() or 1
+    cfg = dataclasses.replace(cfg, news_jitter=news_jitter if news_jitter is not None else (cfg.news_jitter or MC_NEWS_JITTER))
+    seeds = [int(s) for s in np.random.SeedSequence(cfg.seed if seed is None else seed).generate_state(n_runs)]
+    done: Dict[int, dict] = {}; m = 0; converged = False
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = {}; it = iter(enumerate(seeds))
+        def top_up():
+            while len(pending) < 2 * workers:
+                nxt = next(it, None)
+                if nxt is None: return
+                pending[ex.submit(run_summary, cfg, nxt[1])] = nxt[0]
+        top_up()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for f in finished: done[pending.pop(f)] = f.result()
+            while m in done and not converged:
+                m += 1
+                if m >= min_runs and m % check_every == 0:
+                    df = pd.DataFrame([done[i] for i in range(m)])
+                    if on_update: on_update(df)
+                    converged = _converged(df, metric, quantiles, rel_tol, n_boot)
+            if converged:
+                for f in pending: f.cancel()
+                break
+            top_up()
+    runs = pd.DataFrame([done[i] for i in range(m)])
+    return FullMcResult(runs, summarize(runs, quantiles, n_boot), converged)
+
+def main():
+    ap = argparse.ArgumentParser(description="Full-simulation Monte Carlo across seeds")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--runs", type=int, default=64)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--tol", type=float, default=0.05)
+    ap.add_argument("--min-runs", type=int, default=16)
+    ap.add_argument("--news-jitter", type=int, default=None, help=f"+/- steps of news timing per run (default: config, else {MC_NEWS_JITTER})")
+    a = ap.parse_args()
+    cfg = load_config(a.config); log = get_logger("mm")
+    res = run_full_mc(cfg, n_runs=a.runs, workers=a.workers, rel_tol=a.tol, min_runs=a.min_runs, news_jitter=a.news_jitter,
+                      on_update=lambda df: log.info(f"[MC] {len(df)} runs: pnl_end p5={df.pnl_end.quantile(.05):.2f} p50={df.pnl_end.median():.2f}"))
+    os.makedirs(cfg.report_path, exist_ok=True)
+    res.runs.to_csv(os.path.join(cfg.report_path, "MC_FULL_RUNS.csv"), index=False)
+    with open(os.path.join(cfg.report_path, "MC_FULL_SUMMARY.json"), "w") as f:
+        json.dump({"n_runs": len(res.runs), "converged": res.converged, **res.summary}, f, indent=2)
+    print(json.dumps(res.summary["pnl_end"], indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import os, tempfile
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+CATEGORY = "category"
+
+EVENT_SCHEMA = {
+    "symbol": CATEGORY, "timestamp": np.int64, "mid": np.float64, "inventory": np.int64,
+    "pnl": np.float64, "alpha": np.float64, "var_pf": np.float64, "var_comp": np.float64,
+    "es": np.float64, "regime": np.int8, "event": CATEGORY,
+    "p_fill_bid": np.float64, "p_fill_ask": np.float64, "book_ops": np.int64, "quotes_kept": np.int64,
+}
+
+EXEC_SCHEMA = {
+    "venue": CATEGORY, "role": CATEGORY, "side": CATEGORY, "qty": np.int64, "price": np.float64,
+    "mid": np.float64, "fee_bps": np.float64, "fee": np.float64, "spread_capture": np.float64,
+    "symbol": CATEGORY,
+}
+
+class ColumnarRecorder:
+    # One typed NumPy array per field, filled row by row into fixed-size chunks. String
+    # fields ("category") are stored as int32 codes against a per-column vocabulary.
+    # With spill_dir set, full chunks beyond max_chunks_in_memory are saved as .npy files
+    # and memory-mapped back on read, in a directory of this recorder's own under spill_dir
+    # (so recorders of other processes sharing spill_dir never collide).
+    def __init__(self, schema: Dict[str, object], chunk: int = 65536,
+                 spill_dir: Optional[str] = None, max_chunks_in_memory: int = 16):
+        self.schema = dict(schema)
+        self.columns: List[str] = list(schema)
+        self.chunk = int(chunk)
+        self.spill_dir = spill_dir; self.max_chunks_in_memory = max_chunks_in_memory
+        self._spill_path: Optional[str] = None
+        self._cats: Dict[str, Dict[str, int]] = {c: {} for c, t in self.schema.items() if t == CATEGORY}
+        self._is_cat = [c in self._cats for c in self.columns]
+        self._chunks: List[Dict[str, np.ndarray]] = []
+        self._spilled: List[Dict[str, str]] = []
+        self._n = 0
+        self._new_chunk()
+
+    def __len__(self):
+        return self._n
+
+    def _dtype(self, col):
+        return np.int32 if self.schema[col] == CATEGORY else self.schema[col]
+
+    def _new_chunk(self):
+        self._cur = {c: np.empty(self.chunk, dtype=self._dtype(c)) for c in self.columns}
+        self._cols = [self._cur[c] for c in self.columns]
+        self._pos = 0
+
+    def _code(self, col: str, value) -> int:
+        vocab = self._cats[col]; key = "" if value is None else str(value)
+        code = vocab.get(key)
+        if code is None: code = vocab[key] = len(vocab)
+        return code
+
+    def append_row(self, row: Sequence):
+        if self._pos == self.chunk: self._seal()
+        p = self._pos
+        for arr, is_cat, col, v in zip(self._cols, self._is_cat, self.columns, row):
+            arr[p] = self._code(col, v) if is_cat else v
+        self._pos += 1; self._n += 1
+
+    def append(self, **values):
+        self.append_row([values.get(c) for c in self.columns])
+
+    def _seal(self):
+        self._chunks.append(self._cur)
+        if self.spill_dir and len(self._chunks) > self.max_chunks_in_memory:
+            if self._spill_path is None:
+                os.makedirs(self.spill_dir, exist_ok=True)
+                self._spill_path = tempfile.mkdtemp(prefix="rec-", dir=self.spill_dir)
+            old = self._chunks.pop(0); k = len(self._spilled); paths = {}
+            for c, arr in old.items():
+                paths[c] = os.path.join(self._spill_path, f"{k:05d}_{c}.npy")
+                np.save(paths[c], arr)
+            self._spilled.append(paths)
+        self._new_chunk()
+
+    def _parts(self, col: str, start: int = 0, stop: Optional[int] = None) -> List[np.ndarray]:
+        stop = self._n if stop is None else min(stop, self._n)
+        out, off = [], 0
+        blocks = [(p, None) for p in self._spilled] + [(None, ch) for ch in self._chunks] + [(None, self._cur)]
+        for path, ch in blocks:
+            size = self.chunk if ch is not self._cur else self._pos
+            a, b = max(start - off, 0), min(stop - off, size)
+            if a < b:
+                arr = np.load(path[col], mmap_mode="r") if path is not None else ch[col]
+                out.append(arr[a:b])
+            off += size
+            if off >= stop: break
+        return out or [np.empty(0, dtype=self._dtype(col))]
+
+    def column(self, col: str, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        parts = self._parts(col, start, stop)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def categories(self, col: str) -> List[str]:
+        return list(self._cats[col])
+
+    def to_pandas(self, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        # Numeric columns that fall inside a single chunk are handed to pandas without copying.
+        data = {}
+        for c in self.columns:
+            arr = self.column(c, start, stop)
+            if c in self._cats:
+                data[c] = pd.Categorical.from_codes(arr, categories=self.categories(c)) if len(self._cats[c]) else pd.Categorical([])
+            else:
+                data[c] = arr
+        return pd.DataFrame(data, copy=False)
+
+    def to_arrow(self):
+        # Each chunk becomes one Arrow chunk, so numeric columns are not copied.
+        import pyarrow as pa
+        cols = {}
+        for c in self.columns:
+            parts = [np.asarray(p) for p in self._parts(c)]
+            if c in self._cats:
+                dic = pa.array(self.categories(c), type=pa.string())
+                cols[c] = pa.chunked_array([pa.DictionaryArray.from_arrays(pa.array(p), dic) for p in parts],
+                                           type=pa.dictionary(pa.int32(), pa.string()))
+            else:
+                cols[c] = pa.chunked_array([pa.array(p) for p in parts])
+        return pa.table(cols)
@@ -1,11 +1,13 @@
-import random
+from typing import Optional
+import numpy as np
 
 class Regime2State:
     CALM = 0; STRESS = 1
-    def __init__(self, p_stay_calm=0.95, p_stay_stress=0.9):
+    def __init__(self, p_stay_calm=0.95, p_stay_stress=0.9, rng: Optional[np.random.Generator] = None):
         self.p_stay_calm = p_stay_calm; self.p_stay_stress = p_stay_stress; self.state = self.CALM
+        self.rng = rng if rng is not None else np.random.default_rng()
     def step(self):
-        r = random.random()
+        r = self.rng.random()
         if self.state == self.CALM:
             if r > self.p_stay_calm: self.state = self.STRESS
         else:
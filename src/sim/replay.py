@@ -0,0 +1,196 @@
+import os, argparse, dataclasses, logging
+from typing import Dict, Iterator, Optional
+import numpy as np
+from src.utils.config import Config
+from src.execution.depth_lob import DepthLOB
+from src.sim.engine import Simulation
+from src.sim.regime import Regime2State
+
+# One record per L2 level update or trade, sorted by ts (ms). side: +1 bid / buy aggressor,
+# -1 ask / sell aggressor. LEVEL sets the displayed size at a price (0 removes it), TRADE
+# is an aggressive order of qty up to price, and CLEAR drops all external size (snapshot start).
+L2_DTYPE = np.dtype([("ts", "<i8"), ("kind", "u1"), ("side", "i1"), ("price", "<f8"), ("qty", "<i8")])
+CLEAR, LEVEL, TRADE = 0, 1, 2
+
+def iter_l2(path: str, chunk: int = 65536) -> Iterator[np.ndarray]:
+    # Lazily yields record blocks: .npy/.bin are memory-mapped and sliced, Parquet is read
+    # batch by batch, so a day's file is never loaded whole.
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk, columns=list(L2_DTYPE.names)):
+            out = np.empty(batch.num_rows, L2_DTYPE)
+            for name in L2_DTYPE.names: out[name] = batch.column(name).to_numpy()
+            yield out
+        return
+    arr = np.load(path, mmap_mode="r") if path.endswith(".npy") else np.memmap(path, dtype=L2_DTYPE, mode="r")
+    for i in range(0, len(arr), chunk):
+        yield arr[i:i + chunk]
+
+def find_l2(root: str, symbol: str) -> str:
+    for ext in (".npy", ".bin", ".parquet"):
+        p = os.path.join(root, symbol + ext)
+        if os.path.exists(p): return p
+    raise FileNotFoundError(f"No L2 file for {symbol} under {root} (.npy/.bin/.parquet)")
+
+class L2Replay:
+    # Applies recorded records to a DepthLOB as simulated time advances. External size is
+    # kept as EXT orders, so MM quotes queue behind the size that was resting when they
+    # arrived, and recorded trades fill them only once that size has traded.
+    def __init__(self, lob: DepthLOB, path: str, chunk: int = 65536, on_fills=None):
+        self.lob = lob; self.on_fills = on_fills
+        self._chunks = iter_l2(path, chunk)
+        self._buf: Optional[np.ndarray] = None; self._pos = 0
+        self.n_applied = 0
+        self._next_chunk()
+
+    def _next_chunk(self):
+        self._buf = next(self._chunks, None); self._pos = 0
+
+    @property
+    def done(self) -> bool:
+        return self._buf is None
+
+    def peek_ts(self) -> Optional[int]:
+        return None if self._buf is None else int(self._buf["ts"][self._pos])
+
+    def advance_to(self, until: float) -> int:
+        # Apply every record with ts < until.
+        n0 = self.n_applied
+        while self._buf is not None:
+            buf, a = self._buf, self._pos
+            b = a + int(np.searchsorted(buf["ts"][a:], until, side="left"))
+            rows = buf[a:b]
+            for kind, side, price, qty in zip(rows["kind"].tolist(), rows["side"].tolist(),
+                                              rows["price"].tolist(), rows["qty"].tolist()):
+                self._apply(kind, "BUY" if side > 0 else "SELL", price, qty)
+            self.n_applied += b - a
+            if b < len(buf): self._pos = b; break
+            self._next_chunk()
+        return self.n_applied - n0
+
+    def _apply(self, kind: int, side: str, price: float, qty: int):
+        lob = self.lob
+        if kind == LEVEL:
+            if qty > 0:
+                # A level through our own resting quotes means they were taken.
+                opp = lob.best_ask() if side == "BUY" else lob.best_bid()
+                if opp and (opp.price <= price if side == "BUY" else opp.price >= price):
+                    self._fills(lob.place_market("EXT", side, qty, limit_price=price))
+            lob.set_level(side, price, qty)
+        elif kind == TRADE:
+            self._fills(lob.place_market("EXT", side, qty, limit_price=price))
+        elif kind == CLEAR:
+            lob.cancel_owner("EXT")
+
+    def _fills(self, fills):
+        if fills and self.on_fills: self.on_fills(fills)
+
+def write_synthetic_l2(path: str, n_events: int = 100_000, start_price: float = 100.0, tick: float = 0.01,
+                       levels: int = 5, seed: int = 0, mean_gap_ms: float = 5.0) -> str:
+    # Offline fixture: a snapshot followed by a random stream of size changes, trades and
+    # spread refills on a `levels`-deep book whose touch moves when a level empties.
+    rng = np.random.default_rng(seed)
+    rec = np.zeros(n_events + 2 * levels + 1, L2_DTYPE)
+    book = {1: {}, -1: {}}
+    bid = int(round(start_price / tick)) - 1; ask = bid + 2
+    n = 0; ts = 0
+
+    def emit(kind, side, px, qty):
+        nonlocal n
+        if n < len(rec): rec[n] = (ts, kind, side, round(px * tick, 9), qty); n += 1
+
+    emit(CLEAR, 1, 0, 0)
+    for i in range(levels):
+        for side, px in ((1, bid - i), (-1, ask + i)):
+            book[side][px] = int(rng.integers(100, 400)); emit(LEVEL, side, px, book[side][px])
+    while n < len(rec):
+        ts += int(rng.exponential(mean_gap_ms)) + 1
+        u = rng.random()
+        if u < 0.25 and ask - bid > 1:
+            side = 1 if rng.random() < 0.5 else -1
+            px = bid + 1 if side == 1 else ask - 1
+            book[side][px] = int(rng.integers(20, 200)); emit(LEVEL, side, px, book[side][px])
+        elif u < 0.55:
+            side = 1 if rng.random() < 0.5 else -1   # aggressor
+            rs = -side; px = ask if side == 1 else bid
+            q = min(book[rs].get(px, 0), int(rng.choice([20, 50, 100, 200])))
+            if q <= 0: continue
+            emit(TRADE, side, px, q)
+            book[rs][px] -= q; emit(LEVEL, rs, px, book[rs][px])
+        else:
+            side = 1 if rng.random() < 0.5 else -1
+            top = bid if side == 1 else ask
+            px = top - side * int(rng.integers(0, levels))
+            book[side][px] = max(0, book[side].get(px, 0) + int(rng.integers(-60, 61))); emit(LEVEL, side, px, book[side][px])
+        for side in (1, -1):
+            b = book[side]
+            for px in [p for p, q in b.items() if q <= 0]: del b[px]
+            if not b:
+                px = (ask - 1) if side == 1 else (bid + 1)
+                b[px] = int(rng.integers(100, 400)); emit(LEVEL, side, px, b[px])
+            top = max(b) if side == 1 else min(b)
+            deep = top - side * levels     # keep the ladder `levels` deep
+            if deep not in b:
+                b[deep] = int(rng.integers(100, 400)); emit(LEVEL, side, deep, b[deep])
+            for px in [p for p in b if (top - p) * side > levels]:
+                del b[px]; emit(LEVEL, side, px, 0)
+        bid, ask = max(book[1]), min(book[-1])
+    rec = rec[:n]
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if path.endswith(".parquet"):
+        import pyarrow as pa, pyarrow.parquet as pq
+        pq.write_table(pa.table({name: rec[name] for name in L2_DTYPE.names}), path)
+    elif path.endswith(".npy"):
+        np.save(path, rec)
+    else:
+        rec.tofile(path)
+    return path
+
+class ReplaySimulation(Simulation):
+    # Quotes one venue per symbol against recorded L2 data instead of synthetic flow. Each
+    # step covers bar_ms of recorded time, starting from the first record; the run stops early
+    # once every file is exhausted. Hedges trade against the replayed book.
+    def __init__(self, cfg: Config, log: Optional[logging.Logger] = None):
+        venue = next((v for v in cfg.venues if v.name == cfg.replay_venue), cfg.venues[0])
+        self.drivers: Dict[str, L2Replay] = {}
+        super().__init__(dataclasses.replace(cfg, venues=[venue]), log)
+        for s, d in self.drivers.items():
+            d.on_fills = self.routers[s].venues[venue.name].mm.on_fills
+        self.now = min((d.peek_ts() for d in self.drivers.values() if not d.done), default=0)
+
+    def _make_books(self, symbol: str) -> Dict[str, DepthLOB]:
+        cfg = self.cfg
+        lob = DepthLOB(cfg.start_price, cfg.tick_size, levels=0)
+        d = L2Replay(lob, find_l2(cfg.replay_path, symbol), chunk=cfg.replay_chunk)
+        if not d.done: d.advance_to(d.peek_ts() + 1)    # opening snapshot, so the MM starts from a real mid
+        self.drivers[symbol] = d
+        return {cfg.venues[0].name: lob}
+
+    @property
+    def done(self) -> bool:
+        return all(d.done for d in self.drivers.values())
+
+    def step(self):
+        t, routers = self.t, self.routers
+        t1 = self.now + self.cfg.bar_ms
+        self._on_news(t)
+        for s, targets in zip(self.symbols, self._quote_targets()):
+            routers[s].send_quotes(targets, ts=t)
+            self.drivers[s].advance_to(t1)
+        self._mark_all()
+        self.now = t1
+        self._end_step(Regime2State.CALM)
+
+def main():
+    ap = argparse.ArgumentParser(description="Write synthetic L2 replay fixtures, one file per symbol")
+    ap.add_argument("--out", default="data/replay")
+    ap.add_argument("--symbols", nargs="+", default=["XYZ", "ABC"])
+    ap.add_argument("--events", type=int, default=100_000)
+    ap.add_argument("--format", choices=["npy", "bin", "parquet"], default="npy")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    for i, s in enumerate(args.symbols):
+        print(write_synthetic_l2(os.path.join(args.out, f"{s}.{args.format}"), args.events, seed=args.seed + i))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import dataclasses, gc, logging, multiprocessing as mp, traceback
+from multiprocessing import shared_memory
+from threading import BrokenBarrierError
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from src.utils.config import Config
+from src.alpha.news_stream import TapeFeed
+from src.sim.engine import Simulation, SimResult
+
+# Step engine with symbols split across worker processes. The coordinator owns everything
+# shared by all symbols (news and alphas, regime, Hawkes counts, portfolio VaR) and each
+# worker owns the books, MMs and flows of one contiguous block of symbols. Per step, over
+# one shared-memory block and a barrier:
+#   coordinator writes alphas, regime and counts          -> GO
+#   workers quote, run flow and mark; write inv and dmid  -> MARKED
+#   coordinator computes VaR and the hedge decision       -> DECIDED
+#   workers hedge and record their rows (the coordinator already draws the next inputs)
+# Every random stream is keyed by component and symbol, so results match Simulation.
+
+def _layout(n_symbols: int, n_venues: int):
+    S = n_symbols
+    f64 = [("ctrl", (3,)), ("alpha", (S,)), ("inv", (S,)), ("dmid", (S,)), ("comp", (S,))]
+    return f64, [("counts", (S, n_venues, 2))]
+
+def _views(buf, n_symbols: int, n_venues: int) -> Dict[str, np.ndarray]:
+    # ctrl = (regime, hedged, var_pf)
+    f64, i64 = _layout(n_symbols, n_venues)
+    out, off = {}, 0
+    for dtype, fields in ((np.float64, f64), (np.int64, i64)):
+        for name, shape in fields:
+            out[name] = np.ndarray(shape, dtype=dtype, buffer=buf, offset=off)
+            off += int(np.prod(shape)) * 8
+    return out
+
+def _nbytes(n_symbols: int, n_venues: int) -> int:
+    f64, i64 = _layout(n_symbols, n_venues)
+    return 8 * sum(int(np.prod(shape)) for _, shape in f64 + i64)
+
+class ShardWorker(Simulation):
+    # Books of symbols [lo, hi) of the full run, driven by the coordinator's inputs.
+    def __init__(self, cfg: Config, lo: int, hi: int, shm: Dict[str, np.ndarray], barrier):
+        self.lo, self.hi, self.shm, self.barrier = lo, hi, shm, barrier
+        super().__init__(dataclasses.replace(cfg, symbols=list(cfg.symbols[lo:hi])))
+        self.bounds: List[tuple] = []     # (t, first flow exec row, first hedge exec row, end)
+
+    def _make_news(self):
+        return TapeFeed({})
+
+    def run_steps(self, n: int):
+        a, lo, hi, wait = self.shm, self.lo, self.hi, self.barrier.wait
+        for _ in range(n):
+            wait()   # GO
+            st = int(a["ctrl"][0])
+            self.sentiment.alpha[:] = a["alpha"][lo:hi]
+            ex0 = len(self.exec_events)
+            self._advance(st, a["counts"][lo:hi] if self.mhawkes is not None else None)
+            a["inv"][lo:hi] = self.state.pos
+            a["dmid"][lo:hi] = self.state.mark_px - self.state.prev_mark_px
+            ex1 = len(self.exec_events)
+            wait()   # MARKED
+            wait()   # DECIDED
+            t = self.t
+            self._finish_step(st, float(a["ctrl"][2]), a["comp"][lo:hi], bool(a["ctrl"][1]))
+            self.bounds.append((t, ex0, ex1, len(self.exec_events)))
+
+    def take(self):
+        # Rows recorded since the last take, with the exec-row phase bounds of each step.
+        ev0, ex0 = self._flushed
+        out = (self.records.to_pandas(ev0), self.exec_events.to_pandas(ex0), np.array(self.bounds, dtype=np.int64).reshape(-1, 4) - [0, ex0, ex0, ex0])
+        self._flushed = (len(self.records), len(self.exec_events)); self.bounds = []
+        return out
+
+def _worker_main(cfg: Config, lo: int, hi: int, shm_name: str, barrier, conn):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        sim = ShardWorker(cfg, lo, hi, _views(shm.buf, len(cfg.symbols), len(cfg.venues)), barrier)
+        conn.send(("ready", None))
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "close": break
+            sim.run_steps(arg)
+            conn.send(("ok", sim.take()))
+    except BaseException:
+        barrier.abort()
+        try: conn.send(("error", traceback.format_exc()))
+        except (BrokenPipeError, OSError): pass
+    finally:
+        sim = None; gc.collect()   # drop the views into the block before closing it
+        shm.close()
+
+def _categorize(df: pd.DataFrame, cols) -> pd.DataFrame:
+    # Category codes in order of first appearance, as ColumnarRecorder assigns them.
+    for c in cols:
+        v = df[c].to_numpy(dtype=object)
+        df[c] = pd.Categorical(v, categories=pd.unique(v))
+    return df
+
+def _concat(frames: List[pd.DataFrame], keys: Optional[List[np.ndarray]] = None) -> pd.DataFrame:
+    # Frames with differing category vocabularies, optionally reordered by a stable sort on keys.
+    cats = [c for c in frames[0].columns if isinstance(frames[0][c].dtype, pd.CategoricalDtype)]
+    df = pd.concat([f.astype({c: object for c in cats}) for f in frames], ignore_index=True)
+    if keys is not None: df = df.take(np.argsort(np.concatenate(keys), kind="stable")).reset_index(drop=True)
+    return _categorize(df, cats)
+
+class ShardedSimulation(Simulation):
+    # Simulation with the books of cfg.shards contiguous symbol blocks in worker processes.
+    def __init__(self, cfg: Config, log: Optional[logging.Logger] = None, start_method: str = "spawn"):
+        if cfg.engine != "step":
+            raise ValueError(f"shards > 1 needs engine 'step' (got {cfg.engine!r})")
+        self._start_method = start_method; self._shm = None
+        super().__init__(cfg, log)
+
+    def _init_books(self):
+        cfg = self.cfg
+        S, V = len(self.symbols), len(cfg.venues)
+        blocks = [b for b in np.array_split(np.arange(S), min(cfg.shards, S)) if len(b)]
+        self.blocks = [(int(b[0]), int(b[-1]) + 1) for b in blocks]
+        self._shm = shared_memory.SharedMemory(create=True, size=_nbytes(S, V))
+        self.shm = _views(self._shm.buf, S, V)
+        ctx = mp.get_context(self._start_method)
+        self.barrier = ctx.Barrier(len(self.blocks) + 1)
+        self.conns, self.procs = [], []
+        for lo, hi in self.blocks:
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=_worker_main, args=(cfg, lo, hi, self._shm.name, self.barrier, child),
+                            name=f"shard-{lo}-{hi}", daemon=True)
+            p.start(); child.close()
+            self.conns.append(parent); self.procs.append(p)
+        try:
+            for c in self.conns: self._recv(c)
+        except BaseException:
+            self.close(); raise
+        self._events: List[pd.DataFrame] = []; self._execs: List[pd.DataFrame] = []
+
+    def _recv(self, conn):
+        kind, payload = conn.recv()
+        if kind == "error": raise RuntimeError(f"shard worker failed:\n{payload}")
+        return payload
+
+    def _wait(self):
+        try:
+            self.barrier.wait()
+        except BrokenBarrierError:
+            for c in self.conns:
+                if c.poll(5.0): self._recv(c)
+            raise
+
+    def step(self):
+        self.run_steps(1)
+
+    def run_steps(self, n: int):
+        for c in self.conns: c.send(("run", n))
+        for _ in range(n): self._coordinate()
+        self._collect()
+
+    def _coordinate(self):
+        a, cfg = self.shm, self.cfg
+        st, counts = self._draw()
+        a["ctrl"][0] = st; a["alpha"][:] = self.sentiment.alpha
+        if counts is not None: a["counts"][:] = counts
+        self._wait()   # GO
+        self._wait()   # MARKED
+        self.pf_risk.update(a["dmid"].copy())
+        var_bd = self.pf_risk.var(a["inv"].copy(), z=cfg.var_z)
+        a["ctrl"][1] = self._breach(var_bd.var); a["ctrl"][2] = var_bd.var; a["comp"][:] = var_bd.component
+        self._wait()   # DECIDED
+        self.t += 1
+
+    def _collect(self):
+        # Reassemble the single-process row order: events by (step, symbol); executions by
+        # (step, flow fills before hedges, symbol).
+        W = len(self.conns)
+        parts = [self._recv(c) for c in self.conns]
+        ev_keys, ex_keys = [], []
+        for w, (ev, ex, bounds) in enumerate(parts):
+            ev_keys.append(ev["timestamp"].to_numpy(dtype=np.int64) * W + w)
+            k = np.empty(len(ex), dtype=np.int64)
+            for t, a, b, c in bounds.tolist():
+                k[a:b] = (2 * t) * W + w; k[b:c] = (2 * t + 1) * W + w
+            ex_keys.append(k)
+        self._events.append(_concat([p[0] for p in parts], ev_keys))
+        self._execs.append(_concat([p[1] for p in parts], ex_keys))
+
+    def run(self, n: Optional[int] = None, sink=None, flush_every: Optional[int] = None) -> SimResult:
+        n = self.cfg.n_steps if n is None else n
+        chunk = flush_every if sink is not None and flush_every else n
+        while n > 0:
+            k = min(chunk, n); self.run_steps(k); n -= k
+            if sink is not None: self.flush(sink)
+        if sink is not None: sink.close()
+        return self.result()
+
+    def flush(self, sink):
+        ev0, ex0 = self._flushed
+        sink.append(_concat(self._events[ev0:]), _concat(self._execs[ex0:]))
+        self._flushed = (len(self._events), len(self._execs))
+
+    def result(self) -> SimResult:
+        if not self._events: return SimResult(pd.DataFrame(), pd.DataFrame())
+        return SimResult(_concat(self._events), _concat(self._execs))
+
+    def close(self):
+        super().close()
+        if self._shm is None: return
+        for c, p in zip(self.conns, self.procs):
+            try: c.send(("close", None))
+            except (BrokenPipeError, OSError): pass
+            p.join(5.0)
+            if p.is_alive(): p.terminate()
+        self.shm = None; self._shm.close(); self._shm.unlink(); self._shm = None
@@ -0,0 +1,80 @@
+import os
+from typing import Dict
+import pandas as pd
+from src.sim.engine import SimResult
+from src.sim.store import EventStore, plain_arrow
+
+# Sinks receive the run's rows incrementally through append(events, executions) and are
+# finalised with close(); write(result) does both for a finished in-memory result.
+
+class NullSink:
+    def append(self, events: pd.DataFrame, executions: pd.DataFrame): pass
+    def close(self) -> Dict[str, str]: return {}
+
+    def write(self, result: SimResult) -> Dict[str, str]:
+        return {}
+
+class CsvSink:
+    def __init__(self, out_dir: str, events_name: str = "events_multi_v11.csv", exec_name: str = "executions_v11.csv"):
+        self.paths = {"events": os.path.join(out_dir, events_name), "executions": os.path.join(out_dir, exec_name)}
+        self.out_dir = out_dir; self._started = set()
+
+    def append(self, events: pd.DataFrame, executions: pd.DataFrame):
+        os.makedirs(self.out_dir, exist_ok=True)
+        for key, df in (("events", events), ("executions", executions)):
+            first = key not in self._started
+            if first or len(df):
+                df.to_csv(self.paths[key], index=False, mode="w" if first else "a", header=first)
+                self._started.add(key)
+
+    def close(self) -> Dict[str, str]:
+        return dict(self.paths)
+
+    def write(self, result: SimResult) -> Dict[str, str]:
+        self.append(result.events, result.executions); return self.close()
+
+class ParquetSink:
+    def __init__(self, out_dir: str, events_name: str = "events_multi_v11.parquet", exec_name: str = "executions_v11.parquet"):
+        self.paths = {"events": os.path.join(out_dir, events_name), "executions": os.path.join(out_dir, exec_name)}
+        self.out_dir = out_dir; self._writers = {}
+
+    def append(self, events: pd.DataFrame, executions: pd.DataFrame):
+        import pyarrow.parquet as pq
+        os.makedirs(self.out_dir, exist_ok=True)
+        for key, df in (("events", events), ("executions", executions)):
+            if key in self._writers and not len(df): continue
+            t = plain_arrow(df)
+            if key not in self._writers: self._writers[key] = pq.ParquetWriter(self.paths[key], t.schema, compression="zstd")
+            self._writers[key].write_table(t)
+
+    def close(self) -> Dict[str, str]:
+        for w in self._writers.values(): w.close()
+        self._writers.clear()
+        return dict(self.paths)
+
+    def write(self, result: SimResult) -> Dict[str, str]:
+        self.append(result.events, result.executions); return self.close()
+
+class StoreSink:
+    # Appends each flush as a row group into the partitioned EventStore.
+    def __init__(self, root: str, run_id: str):
+        self.root = root; self.run_id = run_id
+        self._writer = EventStore(root).writer(run_id)
+
+    def append(self, events: pd.DataFrame, executions: pd.DataFrame):
+        self._writer.append("events", events)
+        self._writer.append("executions", executions)
+
+    def close(self) -> Dict[str, str]:
+        self._writer.close()
+        return {"store": self.root, "run_id": self.run_id}
+
+    def write(self, result: SimResult) -> Dict[str, str]:
+        self.append(result.events, result.executions); return self.close()
+
+def make_sink(kind: str, cfg):
+    if kind == "csv": return CsvSink(cfg.events_path)
+    if kind == "parquet": return ParquetSink(cfg.events_path)
+    if kind == "store": return StoreSink(cfg.store_path, cfg.run_id)
+    if kind == "none": return NullSink()
+    raise ValueError(f"unknown sink: {kind} (expected csv, parquet, store or none)")
@@ -0,0 +1,78 @@
+import os, shutil
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+# Parquet event store, hive-partitioned as <root>/<table>/run_id=<id>/symbol=<sym>/part-0.parquet.
+# A writer keeps one ParquetWriter per partition open for the whole run, so each append
+# becomes a new row group; readers prune partitions and columns through pyarrow.dataset.
+# Opening a writer replaces the run: every table's run_id=<id> directory is cleared first,
+# so a rerun under the same id leaves nothing of the previous one behind.
+
+def plain_arrow(df: pd.DataFrame):
+    # Categorical vocabularies differ from flush to flush, so dictionary columns are decoded to strings.
+    import pyarrow as pa
+    t = pa.Table.from_pandas(df, preserve_index=False)
+    return t.cast(pa.schema([pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f for f in t.schema]))
+
+class EventStoreWriter:
+    def __init__(self, root: str, run_id: str, compression: str = "zstd"):
+        self.root = root; self.run_id = str(run_id); self.compression = compression
+        self._writers: Dict[tuple, object] = {}
+        for table in EventStore(root).tables():
+            shutil.rmtree(os.path.join(root, table, f"run_id={self.run_id}"), ignore_errors=True)
+
+    def _writer(self, table: str, symbol: str, schema):
+        import pyarrow.parquet as pq
+        key = (table, symbol)
+        w = self._writers.get(key)
+        if w is None:
+            d = os.path.join(self.root, table, f"run_id={self.run_id}", f"symbol={symbol}")
+            os.makedirs(d, exist_ok=True)
+            w = self._writers[key] = pq.ParquetWriter(os.path.join(d, "part-0.parquet"), schema, compression=self.compression)
+        return w
+
+    def append(self, table: str, df: pd.DataFrame):
+        if df is None or len(df) == 0: return
+        sym = df["symbol"].astype(str)
+        for s, part in df.drop(columns=["symbol"]).groupby(sym.values, sort=False):
+            t = plain_arrow(part)
+            self._writer(table, s, t.schema).write_table(t)
+
+    def close(self):
+        for w in self._writers.values(): w.close()
+        self._writers.clear()
+
+class EventStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def writer(self, run_id: str, compression: str = "zstd") -> EventStoreWriter:
+        return EventStoreWriter(self.root, run_id, compression=compression)
+
+    def tables(self) -> List[str]:
+        if not os.path.isdir(self.root): return []
+        return sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+
+    def runs(self, table: str = "events") -> List[str]:
+        d = os.path.join(self.root, table)
+        if not os.path.isdir(d): return []
+        return sorted(x.split("=", 1)[1] for x in os.listdir(d) if x.startswith("run_id="))
+
+    def read(self, table: str, columns: Optional[Iterable[str]] = None,
+             symbols: Optional[Iterable[str]] = None, run_ids: Optional[Iterable[str]] = None,
+             filter=None) -> pd.DataFrame:
+        import pyarrow.dataset as ds
+        path = os.path.join(self.root, table)
+        if not os.path.isdir(path): return pd.DataFrame(columns=list(columns or []))
+        part = ds.partitioning(_partition_schema(), flavor="hive")
+        dset = ds.dataset(path, format="parquet", partitioning=part)
+        expr = filter
+        if symbols is not None:
+            e = ds.field("symbol").isin(list(symbols)); expr = e if expr is None else expr & e
+        if run_ids is not None:
+            e = ds.field("run_id").isin([str(r) for r in run_ids]); expr = e if expr is None else expr & e
+        return dset.to_table(columns=list(columns) if columns is not None else None, filter=expr).to_pandas()
+
+def _partition_schema():
+    import pyarrow as pa
+    return pa.schema([("run_id", pa.string()), ("symbol", pa.string())])
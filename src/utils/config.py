@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List, Optional
 import os, yaml
 
 @dataclass
@@ -20,14 +20,39 @@ class Config:
     alpha_weight: float = 0.7
     obi_weight: float = 0.3
     alpha_smooth: float = 0.2
+    sentiment_lexicon: Dict[str, float] = field(default_factory=dict)   # keyword -> weight, on top of the built-in lexicon
+    sentiment_lexicon_path: Optional[str] = None                        # YAML/JSON keyword -> weight file
     base_spread_bps: float = 5.0
     n_steps: int = 500
+    engine: str = "step"          # "step" (lockstep) | "event" (continuous time with venue latency) | "replay"
+    bar_ms: float = 100.0         # event/replay engines: venue time covered by one step / event row
+    event_sample_every: int = 0   # event engine: also write rows every N idle bars (0: active bars only)
+    shards: int = 1               # step engine: worker processes the symbols are split across (1 = in-process)
+    replay_path: str = "data/replay"   # replay: directory of <symbol>.npy / .bin / .parquet L2 files
+    replay_venue: Optional[str] = None # replay: venue the recorded book belongs to (default: first venue)
+    replay_chunk: int = 65536
+    seed: int = 42
+    news_jitter: int = 0          # +/- steps of random shift applied to synthetic news timestamps
+    news_source: str = "synthetic"   # "synthetic" | "jsonl" (tail news_path) | "socket" (listen on news_host:news_port)
+    news_path: str = "data/news.jsonl"
+    news_host: str = "127.0.0.1"
+    news_port: int = 9009
+    news_queue_size: int = 1024      # per-symbol queue bound; a full queue pauses reading the source
     report_path: str = "reports"
     events_path: str = "data/market_events"
+    # Output sink: "store" (partitioned Parquet under store_path), "csv", "parquet" or "none"
+    sink: str = "store"
+    store_path: str = "data/store"
+    run_id: str = "latest"       # store partition; a run replaces any earlier run with the same id
+    flush_every: int = 1000
     # Risk
     portfolio_var_limit: float = 1500.0
     hedge_portfolio_on_breach: bool = True
     hedge_fraction_portfolio: float = 0.25
+    var_window: int = 50
+    var_mode: str = "window"      # "window" | "ewma"
+    var_ewma_lambda: float = 0.94
+    var_z: float = 1.65
     skew_k: float = 0.8
     tx_fee_bps: float = 0.8
     # Avellaneda–Stoikov
@@ -35,14 +60,30 @@ class Config:
     as_gamma: float = 0.001
     as_k: float = 1.5
     as_T: float = 1.0
+    as_finite_horizon: bool = False   # quote with time-to-close (T - t), the run spanning as_T
     # Hawkes
     use_hawkes: bool = True
     hawkes_mu: float = 0.8
     hawkes_alpha: float = 0.6
     hawkes_beta: float = 0.3
+    hawkes_mode: str = "multi"       # "multi" (buy/sell x venue x symbol) | "1d" (legacy per-symbol)
+    hawkes_exact: bool = False       # multi: Ogata thinning instead of per-step batched Poisson
+    hawkes_side_mu: float = 0.6      # multi: baseline market orders per side/venue/step
+    hawkes_decay: float = 1.0        # multi: kernel decay beta (per step)
+    hawkes_self: float = 0.3
+    hawkes_cross_side: float = 0.05
+    hawkes_cross_venue: float = 0.05
+    hawkes_cross_symbol: float = 0.02   # total over all other symbols
+    hawkes_limit_rate: float = 1.0   # multi: Poisson rate of external limit orders per venue/step
     # ES
     es_conf: float = 0.95
     es_window: int = 100
+    # Monte Carlo bootstrap of the realised portfolio PnL path
+    mc_runs: int = 10000
+    mc_method: str = "iid"        # "iid" | "block" | "stationary"
+    mc_block: int = 20
+    mc_memory_mb: float = 256.0
+    mc_workers: int = 1
     # Venues
     venues: List[VenueConf] = field(default_factory=lambda: [
         VenueConf(name="VENUE_A", maker_fee_bps=-0.05, taker_fee_bps=0.20, latency_ms=2),
@@ -50,6 +91,10 @@ class Config:
         VenueConf(name="VENUE_C", maker_fee_bps=-0.08, taker_fee_bps=0.18, latency_ms=8),
     ])
     router_top_k: int = 2
+    selector_mode: str = "greedy"   # venue ranking: "greedy" (best mean edge) | "ucb" | "thompson"
+    selector_lookback: int = 200    # maker fills per venue in the edge mean
+    selector_ucb_c: float = 1.0
+    markout_steps: int = 5          # steps after a fill at which its adverse move is measured
     impact_kappa: float = 0.03
     # Adaptive tick for quoting
     adaptive_tick: bool = True
@@ -57,6 +102,16 @@ class Config:
     max_tick: float = 0.05
     vol_low: float = 0.0005
     vol_high: float = 0.01
+    # Per market-maker mid history (ring buffer) and realized-vol window
+    vol_window: int = 50
+    history_len: int = 512
+    keep_full_history: bool = False
+    keep_queue: bool = True        # leave a quote resting when its price is unchanged (keeps queue priority)
+    keep_min_frac: float = 0.5     # ...unless partial fills left less than this fraction of the wanted size
+    flow_ewma: float = 0.1         # EWMA weight of per-step market volume used for fill probabilities
+    # Columnar recorders: rows per chunk, optional directory for spilling full chunks
+    recorder_chunk: int = 65536
+    recorder_spill_dir: Optional[str] = None
 
 def _parse_venues(lst):
     out = []
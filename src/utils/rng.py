@@ -0,0 +1,35 @@
+import zlib
+from typing import Dict, List, Tuple, Union
+import numpy as np
+
+Key = Union[str, int]
+
+def _word(k: Key) -> int:
+    return int(k) if isinstance(k, (int, np.integer)) else zlib.crc32(str(k).encode())
+
+class RngRegistry:
+    # One numpy Generator per (component, symbol, venue, ...) key, all derived from a single
+    # root SeedSequence. A key maps to a fixed spawn_key (names hashed with crc32), which is
+    # what SeedSequence.spawn would assign a child, so a stream depends only on the root seed
+    # and its own key, not on the order in which components ask for streams.
+    def __init__(self, seed: Union[int, np.random.SeedSequence, None] = None):
+        self._root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self._cache: Dict[Tuple[int, ...], np.random.Generator] = {}
+
+    @property
+    def entropy(self):
+        return self._root.entropy
+
+    def seed_sequence(self, *key: Key) -> np.random.SeedSequence:
+        return np.random.SeedSequence(self._root.entropy, spawn_key=self._root.spawn_key + tuple(_word(k) for k in key))
+
+    def get(self, *key: Key) -> np.random.Generator:
+        k = tuple(_word(x) for x in key)
+        g = self._cache.get(k)
+        if g is None:
+            g = self._cache[k] = np.random.default_rng(self.seed_sequence(*key))
+        return g
+
+    def spawn(self, n: int) -> List["RngRegistry"]:
+        # Independent child registries, e.g. one per parallel worker or Monte Carlo run.
+        return [RngRegistry(s) for s in self._root.spawn(n)]
@@ -0,0 +1,103 @@
+import os, argparse, dataclasses
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from src.utils.config import Config, load_config
+from src.utils.logger import get_logger
+from src.reporting.performance_stats import basic_stats
+from src.reporting.risk_montecarlo import mc_from_df
+from src.reporting.stages import run_stages
+from src.sim.event_engine import make_simulation
+from src.sim.sinks import make_sink
+
+def grid_points(grid: Dict[str, list]) -> List[dict]:
+    keys = list(grid)
+    return [dict(zip(keys, vals)) for vals in product(*(grid[k] for k in keys))]
+
+def random_points(space: Dict[str, object], n: int, seed: int = 0) -> List[dict]:
+    # (lo, hi) tuples are sampled uniformly (as ints if both bounds are ints); lists are sampled by choice.
+    rng = np.random.default_rng(seed); out = []
+    for _ in range(n):
+        pt = {}
+        for k, v in space.items():
+            if isinstance(v, tuple):
+                lo, hi = v
+                pt[k] = int(rng.integers(lo, hi + 1)) if isinstance(lo, int) and isinstance(hi, int) else float(rng.uniform(lo, hi))
+            else:
+                pt[k] = v[int(rng.integers(0, len(v)))]
+        out.append(pt)
+    return out
+
+def _run_one(base: Config, overrides: dict, run_id: str, seed: int, out_root: str, write_outputs: bool = False) -> dict:
+    run_dir = os.path.join(out_root, run_id)
+    cfg = dataclasses.replace(base, **overrides, seed=seed,
+                              report_path=os.path.join(run_dir, "reports"),
+                              events_path=os.path.join(run_dir, "market_events"),
+                              store_path=os.path.join(out_root, "store"), run_id=run_id)
+    sim = make_simulation(cfg)
+    try:
+        result = sim.run(cfg.n_steps)
+    finally:
+        sim.close()
+    if write_outputs:
+        make_sink(cfg.sink, cfg).write(result)
+        run_stages(result, cfg, ("attribution", "mc"))
+    pf = result.events.groupby("timestamp")[["pnl", "inventory"]].sum().reset_index()
+    row = {"run_id": run_id, "seed": seed, **overrides}
+    row.update(basic_stats(pf).to_dict())
+    mc = mc_from_df(result.events, n_runs=cfg.mc_runs, seed=123, method=cfg.mc_method, block=cfg.mc_block,
+                    memory_mb=cfg.mc_memory_mb)
+    row.update({f"mc_{k}": v for k, v in mc.items() if not isinstance(v, dict)})
+    row.update({f"mc_{k}_{q}": v for k, d in mc.items() if isinstance(d, dict) for q, v in d.items()})
+    return row
+
+def run_sweep(points: List[dict], base: Config = None, out_root: str = "sweeps/latest",
+              workers: int = None, seed: int = None, write_outputs: bool = False) -> pd.DataFrame:
+    base = base or load_config()
+    fields = {f.name for f in dataclasses.fields(Config)}
+    bad = sorted({k for p in points for k in p} - fields)
+    if bad: raise ValueError(f"unknown Config fields in sweep: {bad}")
+    seeds = np.random.SeedSequence(base.seed if seed is None else seed).generate_state(len(points))
+    os.makedirs(out_root, exist_ok=True)
+    log = get_logger("mm"); rows = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as ex:
+        futs = {ex.submit(_run_one, base, p, f"run_{i:04d}", int(seeds[i]), out_root, write_outputs): i for i, p in enumerate(points)}
+        for fut in as_completed(futs):
+            row = fut.result(); rows.append(row)
+            log.info(f"[SWEEP] {row['run_id']} done ({len(rows)}/{len(points)}): pnl_end={row['pnl_end']:.2f}")
+    res = pd.DataFrame(rows).sort_values("run_id").reset_index(drop=True)
+    res.to_csv(os.path.join(out_root, "sweep_results.csv"), index=False)
+    return res
+
+def _parse_values(field: str, text: str) -> list:
+    typ = type(getattr(Config(), field))
+    conv = (lambda x: x.lower() in ("1", "true", "yes")) if typ is bool else typ
+    return [conv(x) for x in text.split(",")]
+
+def main():
+    ap = argparse.ArgumentParser(description="Parameter sweep over Config fields")
+    ap.add_argument("--config", default="config.yaml")
+    ap.add_argument("--grid", action="append", default=[], help="field=v1,v2,... (cartesian product)")
+    ap.add_argument("--range", action="append", default=[], help="field=lo:hi for random search")
+    ap.add_argument("--random", type=int, default=0, help="number of random-search points")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--out", default="sweeps/latest")
+    ap.add_argument("--write-outputs", action="store_true", help="also write per-run events (via Config.sink), attribution and MC summary")
+    a = ap.parse_args()
+    base = load_config(a.config)
+    grid = {k: _parse_values(k, v) for k, v in (g.split("=", 1) for g in a.grid)}
+    points = grid_points(grid) if grid else [{}]
+    if a.random:
+        space = {}
+        for r in a.range:
+            k, v = r.split("=", 1); lo, hi = _parse_values(k, v.replace(":", ","))
+            space[k] = (lo, hi)
+        points = [{**p, **q} for p in points for q in random_points(space, a.random, seed=base.seed)]
+    res = run_sweep(points, base=base, out_root=a.out, workers=a.workers, seed=a.seed, write_outputs=a.write_outputs)
+    print(res.to_string())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import math
+import numpy as np
+import pytest
+from src.execution.depth_lob import DepthLOB
+
+TICK = 0.01
+
+class RefBook:
+    # Plain reference: per side {absolute tick: [[oid, owner, qty], ...]} in FIFO order,
+    # everything rescanned on every query.
+    def __init__(self, lob: DepthLOB):
+        self.side = {"BUY": {}, "SELL": {}}
+        self.where = {}; self.impact = 0.0
+        for oid, node in lob._order_index.items():   # the seeded book, in id (= arrival) order
+            self._add(oid, node.order.owner, node.side, lob._ref + node.level.idx, node.order.qty)
+
+    def _add(self, oid, owner, side, tick, qty):
+        self.side[side].setdefault(tick, []).append([oid, owner, qty]); self.where[oid] = (side, tick)
+
+    def _pop(self, oid):
+        side, tick = self.where.pop(oid)
+        q = self.side[side][tick]; i = next(j for j, e in enumerate(q) if e[0] == oid); e = q.pop(i)
+        if not q: del self.side[side][tick]
+        return e, i
+
+    def place(self, oid, owner, side, price, qty):
+        x = price / TICK
+        self._add(oid, owner, side, math.floor(x + 1e-9) if side == "BUY" else math.ceil(x - 1e-9), qty)
+
+    def cancel(self, oid):
+        if oid in self.where: self._pop(oid)
+
+    def amend(self, oid, price, qty):
+        if oid not in self.where: return
+        side, tick = self.where[oid]
+        e = next(e for e in self.side[side][tick] if e[0] == oid)
+        new_tick = tick if price is None else (math.floor(price / TICK + 1e-9) if side == "BUY" else math.ceil(price / TICK - 1e-9))
+        new_qty = e[2] if qty is None else qty
+        if new_qty <= 0: self._pop(oid)
+        elif new_tick == tick and new_qty <= e[2]: e[2] = new_qty
+        else: self._pop(oid); self._add(oid, e[1], side, new_tick, new_qty)
+
+    def market(self, side, qty, limit_tick=None):
+        book = self.side["SELL" if side == "BUY" else "BUY"]; fills = []
+        while qty > 0 and book:
+            tick = min(book) if side == "BUY" else max(book)
+            if limit_tick is not None and (tick > limit_tick if side == "BUY" else tick < limit_tick): break
+            q = book[tick]
+            while qty > 0 and q:
+                e = q[0]; take = min(qty, e[2]); e[2] -= take; qty -= take
+                fills.append((e[0], e[1], round(tick * TICK, 9), take))
+                if e[2] == 0: q.pop(0); del self.where[e[0]]
+            if not q: del book[tick]
+        return fills
+
+    def set_level(self, side, price, qty, new_oid):
+        # EXT's size at the level becomes qty: growth is one new order at the back, shrinkage
+        # comes off the back-most EXT orders.
+        tick = round(price / TICK); q = self.side[side].get(tick, [])
+        d = qty - sum(e[2] for e in q if e[1] == "EXT")
+        if d > 0: self._add(new_oid, "EXT", side, tick, d); return
+        for e in reversed(list(q)):
+            if d == 0: break
+            if e[1] != "EXT": continue
+            take = min(-d, e[2]); d += take
+            if take == e[2]: self._pop(e[0])
+            else: e[2] -= take
+
+    def shift(self, delta):
+        self.impact += delta; n = int(round(self.impact / TICK))
+        if not n: return
+        self.impact -= n * TICK
+        for side in self.side:
+            self.side[side] = {t + n: q for t, q in self.side[side].items()}
+        self.where = {oid: (s, t + n) for oid, (s, t) in self.where.items()}
+
+    def touch(self, side):
+        book = self.side[side]
+        if not book: return None
+        t = max(book) if side == "BUY" else min(book)
+        return round(t * TICK, 9), sum(e[2] for e in book[t])
+
+def check(lob: DepthLOB, ref: RefBook):
+    for side, levels, best in (("BUY", lob.bids, lob.best_bid), ("SELL", lob.asks, lob.best_ask)):
+        b = best(); t = ref.touch(side)
+        assert (b.price, b.qty) == t if t else b is None
+        got = {lob._ref + i: [] for i in levels}
+        for i, lvl in levels.items():
+            node, total = lvl.head, 0
+            while node:
+                got[lob._ref + i].append([node.order.order_id, node.order.owner, node.order.qty]); total += node.order.qty
+                node = node.next
+            assert total == lvl.qty   # cached level qty
+        assert got == ref.side[side]
+    assert set(lob._order_index) == set(ref.where)
+    for oid, (side, tick) in ref.where.items():
+        q = ref.side[side][tick]; i = next(j for j, e in enumerate(q) if e[0] == oid)
+        assert lob.same_price(oid, round(tick * TICK, 9))
+        assert lob.queue_ahead(oid) == sum(e[2] for e in q[:i])
+
+def test_seeded_book_matches_reference():
+    lob = DepthLOB(100.0, TICK)
+    ref = RefBook(lob); check(lob, ref)
+    assert lob.mid() == 100.0 and lob.best_bid().price == 99.99 and lob.best_ask().price == 100.01
+
+def test_fifo_fills_within_level():
+    lob = DepthLOB(100.0, TICK); ref = RefBook(lob)
+    ids = [lob.place_limit(o, "SELL", 100.01, q, 1) for o, q in (("A", 30), ("B", 50), ("C", 20))]
+    for oid, (o, q) in zip(ids, (("A", 30), ("B", 50), ("C", 20))): ref.place(oid, o, "SELL", 100.01, q)
+    fills = lob.place_market("EXT", "BUY", 260)
+    assert [(f.order_id, f.qty) for f in fills] == [(f[0], f[3]) for f in ref.market("BUY", 260)]
+    assert [f.owner for f in fills] == ["EXT", "A", "B"] and fills[-1].qty == 30
+    assert lob.volume["BUY"] == 260
+    check(lob, ref)
+
+def test_priority_after_cancel_and_amend():
+    lob = DepthLOB(100.0, TICK); ref = RefBook(lob)
+    a, b, c = (lob.place_limit("MM", "BUY", 99.99, 10, 1) for _ in range(3))
+    for oid in (a, b, c): ref.place(oid, "MM", "BUY", 99.99, 10)
+    lob.cancel(a); ref.cancel(a)
+    assert lob.queue_ahead(b) == 200 and lob.queue_ahead(c) == 210
+    lob.amend(b, qty=4); ref.amend(b, None, 4)       # size-down keeps priority
+    assert lob.queue_ahead(c) == 204
+    lob.amend(b, qty=8); ref.amend(b, None, 8)       # size-up requeues
+    assert lob.queue_ahead(b) == 210
+    lob.amend(c, price=99.98); ref.amend(c, 99.98, None)
+    assert lob.queue_ahead(c) == 200 and lob.queue_ahead(c, include_better=True) == 200 + 208
+    check(lob, ref)
+
+def test_shift_prices_moves_levels_and_keeps_index():
+    lob = DepthLOB(100.0, TICK); ref = RefBook(lob)
+    oid = lob.place_limit("MM", "BUY", 99.97, 10, 1); ref.place(oid, "MM", "BUY", 99.97, 10)
+    for d in (0.004, 0.004, 0.03, -0.052):   # sub-tick impact carries until it adds up to a tick
+        lob.shift_prices(d); ref.shift(d); check(lob, ref)
+    assert lob.amend(oid, price=99.99, qty=10); ref.amend(oid, 99.99, 10)
+    assert lob.cancel(oid); ref.cancel(oid)
+    check(lob, ref)
+
+@pytest.mark.parametrize("seed", range(6))
+def test_random_operations_match_reference(seed):
+    rng = np.random.default_rng(seed)
+    lob = DepthLOB(100.0, TICK); ref = RefBook(lob)
+    live = list(ref.where)
+    for step in range(400):
+        op = rng.integers(7)
+        if op <= 1:
+            side = "BUY" if rng.random() < 0.5 else "SELL"
+            mid = lob.mid() or 100.0
+            price = round(mid + (-1 if side == "BUY" else 1) * rng.integers(0, 8) * TICK + rng.choice([0.0, 0.004]), 6)
+            qty = int(rng.integers(1, 120)); owner = str(rng.choice(["MM", "EXT"]))
+            oid = lob.place_limit(owner, side, price, qty, step); ref.place(oid, owner, side, price, qty); live.append(oid)
+        elif op == 2 and live:
+            oid = live[rng.integers(len(live))]
+            assert lob.cancel(oid) == (oid in ref.where); ref.cancel(oid)
+        elif op == 3 and live:
+            oid = live[rng.integers(len(live))]
+            price = None if rng.random() < 0.5 else round((lob.mid() or 100.0) + rng.integers(-6, 7) * TICK, 6)
+            qty = None if price is not None and rng.random() < 0.5 else int(rng.integers(0, 150))
+            assert lob.amend(oid, price=price, qty=qty) == (oid in ref.where); ref.amend(oid, price, qty)
+        elif op == 4:
+            side = "BUY" if rng.random() < 0.5 else "SELL"; qty = int(rng.integers(1, 400))
+            lim = None
+            if rng.random() < 0.5:
+                t = ref.touch("SELL" if side == "BUY" else "BUY")
+                lim = None if t is None else round(t[0] + (1 if side == "BUY" else -1) * rng.integers(0, 3) * TICK, 6)
+            fills = lob.place_market("EXT", side, qty, limit_price=lim)
+            lt = None if lim is None else (math.floor(lim / TICK + 1e-9) if side == "BUY" else math.ceil(lim / TICK - 1e-9))
+            assert [(f.order_id, f.owner, f.price, f.qty) for f in fills] == ref.market(side, qty, lt)
+        elif op == 5:
+            d = float(rng.choice([-1, 1]) * rng.choice([0.003, 0.01, 0.02, 0.047])); lob.shift_prices(d); ref.shift(d)
+        else:
+            side = "BUY" if rng.random() < 0.5 else "SELL"; t = ref.touch(side)
+            if t is not None:
+                qty = int(rng.integers(0, 300))
+                lob.set_level(side, t[0], qty); ref.set_level(side, t[0], qty, lob._next_id - 1)
+        check(lob, ref)
@@ -0,0 +1,22 @@
+import dataclasses
+import numpy as np
+import pytest
+from src.utils.config import Config
+from src.sim.event_engine import make_simulation
+
+@pytest.mark.parametrize("engine", ["step", "event"])
+@pytest.mark.parametrize("seed", [1, 42])
+def test_ledger_is_sum_of_venue_inventory(engine, seed):
+    # pos is the symbol's net position across venues, and quoting never takes it past the limit
+    cfg = dataclasses.replace(Config(), engine=engine, seed=seed, hedge_portfolio_on_breach=False)
+    sim = make_simulation(cfg)
+    try:
+        for _ in range(200):
+            sim.step()
+            st = sim.state
+            np.testing.assert_array_equal(st.pos, st.by_symbol(st.inv).sum(axis=1))
+            assert np.abs(st.pos).max() <= cfg.inventory_limit
+        for i, s in enumerate(sim.symbols):
+            assert sim.routers[s].inventory() == st.pos[i]
+    finally:
+        sim.close()
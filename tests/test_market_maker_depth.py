@@ -0,0 +1,52 @@
+import math
+import pytest
+from src.execution.depth_lob import DepthLOB
+from src.execution.market_maker_depth import MarketMakerDepth
+from src.execution.risk_manager import RiskManager
+
+def _mm(**kw) -> MarketMakerDepth:
+    # DepthLOB(100) rests 200 EXT at 99.99, 99.98, ... and 100.01, 100.02, ...
+    return MarketMakerDepth(DepthLOB(100.0, 0.01), RiskManager(1000), 10, 1000, **kw)
+
+def test_queue_ahead():
+    lob = DepthLOB(100.0, 0.01)
+    a = lob.place_limit("MM", "BUY", 99.99, 10, 0)
+    b = lob.place_limit("MM", "BUY", 99.98, 10, 0)
+    assert lob.queue_ahead(a) == 200 and lob.queue_ahead(a, include_better=True) == 200
+    assert lob.queue_ahead(b) == 200 and lob.queue_ahead(b, include_better=True) == 200 + 210
+    lob.place_market("EXT", "SELL", 150)
+    assert lob.queue_ahead(a) == 50 and lob.queue_ahead(b, include_better=True) == 200 + 60
+    assert lob.queue_ahead(12345) is None
+
+@pytest.mark.parametrize("keep_queue", [True, False])
+def test_unchanged_requote_keeps_priority(keep_queue):
+    mm = _mm(keep_queue=keep_queue)
+    mm.send_quotes((99.99, 100.01, 10, 10), 0)
+    bid = mm.qids.bid_id
+    mm.lob.place_limit("EXT", "BUY", 99.99, 100, 1)   # joins behind the MM
+    mm.send_quotes((99.99, 100.01, 10, 10), 1)
+    if keep_queue:
+        assert mm.qids.bid_id == bid and mm.quotes_kept == 2
+        assert mm.lob.queue_ahead(mm.qids.bid_id) == 200
+    else:
+        assert mm.quotes_kept == 0
+        assert mm.lob.queue_ahead(mm.qids.bid_id) == 300
+
+def test_size_down_keeps_priority_and_reprice_requeues():
+    mm = _mm()
+    mm.send_quotes((99.99, 100.01, 10, 10), 0)
+    bid = mm.qids.bid_id
+    mm.lob.place_limit("EXT", "BUY", 99.99, 100, 1)
+    mm.send_quotes((99.99, 100.01, 6, 10), 1)
+    assert mm.qids.bid_id == bid and mm.lob.order(bid).qty == 6 and mm.lob.queue_ahead(bid) == 200
+    mm.send_quotes((99.98, 100.01, 6, 10), 2)
+    assert mm.lob.queue_ahead(mm.qids.bid_id) == 200 and mm.lob.queue_ahead(mm.qids.bid_id, include_better=True) == 200 + 300
+
+def test_fill_probability():
+    mm = _mm()
+    assert mm.fill_probability() == (0.0, 0.0)   # no quotes
+    mm.send_quotes((99.99, 100.01, 10, 10), 0)
+    assert mm.fill_probability() == (0.0, 0.0)   # no observed flow
+    mm.state.flow_rate[mm.k] = (50.0, 100.0)     # per-step volume of buy / sell aggressors
+    pb, pa = mm.fill_probability(horizon=2.0)
+    assert pb == pytest.approx(math.exp(-200 / 200.0)) and pa == pytest.approx(math.exp(-200 / 100.0))
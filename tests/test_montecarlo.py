@@ -0,0 +1,15 @@
+import dataclasses
+import pandas as pd
+import pytest
+from src.utils.config import Config
+from src.sim.montecarlo import run_full_mc
+
+@pytest.mark.parametrize("rel_tol", [1e6, 1e-9])   # converges at the first check / never
+def test_full_mc_does_not_depend_on_worker_scheduling(rel_tol):
+    cfg = dataclasses.replace(Config(), symbols=["XYZ"], n_steps=20)
+    kw = dict(n_runs=8, seed=7, rel_tol=rel_tol, min_runs=4, check_every=2, n_boot=50)
+    a = run_full_mc(cfg, workers=1, **kw); b = run_full_mc(cfg, workers=3, **kw)
+    assert a.converged == b.converged == (rel_tol > 1)
+    assert len(a.runs) == (4 if a.converged else 8)
+    pd.testing.assert_frame_equal(a.runs, b.runs)
+    assert a.summary == b.summary
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from src.execution.portfolio_state import PortfolioState
+
+def _state(**kw) -> PortfolioState:
+    st = PortfolioState(["XYZ"], ["A", "B"], **kw)
+    st.init_book(0, 100.0); st.init_book(1, 200.0)
+    return st
+
+@pytest.mark.parametrize("n_marks", [3, 4, 9, 12])
+def test_full_history_is_every_mark(n_marks):
+    st = _state(history_len=4, keep_full_history=True)
+    marks = 101.0 + np.arange(n_marks)
+    for m in marks: st.mark([m, 2 * m])
+    np.testing.assert_array_equal(st.mid_history(0), np.concatenate(([100.0], marks)))
+    np.testing.assert_array_equal(st.mid_history(1), np.concatenate(([200.0], 2 * marks)))
+
+def test_bounded_history_keeps_last_marks():
+    st = _state(history_len=4)
+    for m in range(101, 110): st.mark([m, m])
+    np.testing.assert_array_equal(st.mid_history(0), [106, 107, 108, 109])
+
+def test_partial_marks_record_history_of_marked_books():
+    st = PortfolioState(["XYZ", "ABC"], ["A"], history_len=3, keep_full_history=True)
+    st.init_book(0, 100.0); st.init_book(1, 50.0)
+    for m in (101.0, 102.0, 103.0, 104.0): st.mark([m], idx=[0])
+    st.mark([105.0, 51.0])
+    np.testing.assert_array_equal(st.mid_history(0), [100, 101, 102, 103, 104, 105])
+    np.testing.assert_array_equal(st.mid_history(1), [50, 51])
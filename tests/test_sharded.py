@@ -0,0 +1,35 @@
+import dataclasses
+import pandas as pd
+import pytest
+from src.utils.config import Config
+from src.sim.event_engine import make_simulation
+
+def _run(cfg: Config):
+    sim = make_simulation(cfg)
+    try:
+        return sim.run()
+    finally:
+        sim.close()
+
+@pytest.mark.parametrize("overrides", [{}, {"hawkes_mode": "1d"}, {"portfolio_var_limit": 50.0}])
+def test_sharded_matches_single_process(overrides):
+    cfg = dataclasses.replace(Config(), symbols=[f"S{i}" for i in range(5)], n_steps=60, **overrides)
+    a = _run(cfg); b = _run(dataclasses.replace(cfg, shards=2))
+    assert len(a.events) == 5 * 60
+    pd.testing.assert_frame_equal(a.events, b.events)
+    pd.testing.assert_frame_equal(a.executions, b.executions)
+
+def test_sharded_flushes_match(tmp_path):
+    cfg = dataclasses.replace(Config(), symbols=["A", "B", "C"], n_steps=40, shards=2)
+    sim = make_simulation(cfg)
+    try:
+        res = sim.run(20)
+        sim.run_steps(20)
+        assert sim.t == 40
+        pd.testing.assert_frame_equal(sim.result().events.iloc[:len(res.events)], res.events)
+    finally:
+        sim.close()
+
+def test_sharded_rejects_event_engine():
+    with pytest.raises(ValueError):
+        make_simulation(dataclasses.replace(Config(), shards=2, engine="event"))
@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+from src.execution.depth_lob import DepthLOB
+from src.execution.market_maker_depth import MarketMakerDepth
+from src.execution.risk_manager import RiskManager
+from src.execution.smart_router import SmartVenueSelector
+
+def _mm(name: str, sel: SmartVenueSelector) -> MarketMakerDepth:
+    mm = MarketMakerDepth(DepthLOB(100.0, 0.01), RiskManager(1000), 10, 1000, venue_name=name, symbol="XYZ")
+    mm.fill_listener = sel.on_fill
+    return mm
+
+def test_one_sided_fill_cannot_decide_ranking():
+    sel = SmartVenueSelector(markout_steps=1)
+    b = _mm("B", sel)
+    for _ in range(3): sel.on_fill("A", "BUY", 10, 99.99, 100.0, 0.1, 0.0)
+    # B's ask is the whole book: the fill empties it, leaving no mid to measure capture against
+    b.lob.cancel_owner("EXT")
+    b.send_quotes((99.99, 100.01, 0, 10), 0)
+    b.on_fills(b.lob.place_market("EXT", "BUY", 10))
+    assert b.inv == -10 and b.lob.mid() == 0.0
+    sel.settle({"A": 100.0, "B": 0.0}); sel.settle({"A": 100.0, "B": 100.0})
+    assert sel.stats["B"].fills == 1 and sel.stats["B"].spread_capture == 0.0
+    assert sel.pick_venues({n: SimpleNamespace(name=n) for n in ("B", "A")}) == ["A", "B"]
+
+def test_markout_scores_adverse_move():
+    sel = SmartVenueSelector(markout_steps=2)
+    sel.on_fill("A", "BUY", 10, 99.9, 100.0, 1.0, 0.0)
+    sel.settle({"A": 99.0})
+    assert "A" not in sel.stats   # horizon not reached
+    sel.settle({"A": 99.0})
+    assert sel.stats["A"].adverse_moves == 10.0 and sel.expected_value("A") == -9.0
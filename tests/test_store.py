@@ -0,0 +1,16 @@
+import pandas as pd
+from src.sim.store import EventStore
+
+def _write(store: EventStore, run_id: str, symbols):
+    w = store.writer(run_id)
+    w.append("executions", pd.DataFrame({"symbol": symbols, "qty": range(len(symbols))}))
+    w.close()
+
+def test_rerun_replaces_previous_run(tmp_path):
+    store = EventStore(str(tmp_path))
+    _write(store, "latest", ["XYZ", "ABC"]); _write(store, "other", ["XYZ"])
+    _write(store, "latest", ["XYZ"])   # ABC has no rows this time
+    df = store.read("executions", run_ids=["latest"])
+    assert df["symbol"].astype(str).tolist() == ["XYZ"]
+    assert len(store.read("executions", run_ids=["other"])) == 1
+    assert store.runs("executions") == ["latest", "other"]